@@ -0,0 +1,77 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Times Analyzer.analyze, alone, on already loaded specs
+
+  By default the OpenBanking specs cached by tests/openbanking are used, so
+  run `pytest tests/openbanking` first, or name spec files on the command line:
+
+    python -m benchmarks.bench_analyzer [-n REPEAT] [spec ...]
+"""
+import argparse
+import glob
+import sys
+import time
+
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.analyzer import Analyzer
+from openapi_spec_sanitizer.loader import Loader
+from openapi_spec_sanitizer.exceptions import Warning, Unrecoverable
+
+OPENBANKING_CACHE = './tests/openbanking/.cache'
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_analyze(spec, repeat):
+    args = ArgParser().parse_args([spec])
+    loader = Loader(args)
+    document = loader.load(spec)
+    line_index = loader.line_index
+
+    def analyze():
+        try:
+            Analyzer(args).analyze(document, line_index)
+        except (Warning, Unrecoverable):
+            pass
+    return best_of(repeat, analyze)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Analyzer.analyze')
+    parser.add_argument('specs', nargs='*', help="spec files (default OpenBanking cache)")
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    specs = args.specs or sorted(glob.glob(f"{OPENBANKING_CACHE}/*.yaml") + glob.glob(f"{OPENBANKING_CACHE}/*.json"))
+    if not specs:
+        print(f"no specs given, and nothing cached in {OPENBANKING_CACHE}", file=sys.stderr)
+        return 1
+    for spec in specs:
+        print(f"{spec:70} analyze {bench_analyze(spec, args.repeat) * 1000:10.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Import time of the command line, as python -X importtime has it, in a fresh
+  interpreter each time, best of REPEAT, and the modules taking the most of it
+
+    python -m benchmarks.bench_import [-n REPEAT] [--top N] [module]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+import openapi_spec_sanitizer
+
+MAIN = 'openapi_spec_sanitizer.__main__'
+
+
+def import_times(module=MAIN):
+    """
+      {module: (self, cumulative)} microseconds, of every module imported by importing module
+    """
+    env = dict(os.environ)
+    src = os.path.dirname(os.path.dirname(openapi_spec_sanitizer.__file__))
+    env['PYTHONPATH'] = os.pathsep.join([src] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                               env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the command line')
+    parser.add_argument('module', nargs='?', default=MAIN)
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="modules with the most cumulative time shown")
+    args = parser.parse_args(argv)
+    best = None
+    for _ in range(args.repeat):
+        times = import_times(args.module)
+        if best is None or times[args.module][1] < best[args.module][1]:
+            best = times
+    print(f"{args.module:50} {best[args.module][1] / 1000:8.1f} ms, {len(best)} modules imported")
+    for name, (own, cumulative) in sorted(best.items(), key=lambda item: -item[1][1])[1:args.top + 1]:
+        print(f"  {name:48} {cumulative / 1000:8.1f} ms ({own / 1000:.1f} ms itself)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
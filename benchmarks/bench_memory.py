@@ -0,0 +1,139 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Memory taken by the Analyzer's component graph, with Entry as it is (__slots__,
+  referrers shared until there are some) against Entry as it was (a __dict__,
+  and a referrers dict, each), as measured by tracemalloc
+
+  Per Entry, for N entries, a component with a referrer for each $ref, then the
+  peak of Analyzer.analyze on a synthetic spec of N paths, or on spec files:
+
+    python -m benchmarks.bench_memory [-n N] [spec ...]
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from unittest import mock
+
+from openapi_spec_sanitizer import analyzer
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.entry import Entry
+from openapi_spec_sanitizer.loader import Loader
+from openapi_spec_sanitizer.exceptions import Warning, Unrecoverable
+
+
+def _dict_entry_init(self, tipe, node_path, line=None):
+    self.tipe = tipe
+    self.node_path = node_path
+    self.line = line
+    self.ref = None
+    self.referrers = {}
+    self.component = None
+    self.declared = False
+    self.required = None
+    self.container = None
+    self.key = None
+    self.generation = None
+
+
+# Entry, as it was
+DictEntry = type('DictEntry', (), {**{name: value for name, value in vars(Entry).items()
+                                      if callable(value) and name not in ('__init__', '__repr__')},
+                                   '__init__': _dict_entry_init})
+
+
+def measure(fn):
+    """
+      (peak, retained) bytes allocated by fn
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return peak, retained
+
+
+def entries(entry_class, n):
+    """
+      n components, and n $refs, each referring to one of them, as the Analyzer makes
+    """
+    made = []
+    for i in range(n):
+        component = entry_class('Component', f"/components/schemas/schema{i}")
+        referrer = entry_class('Referrer', f"/paths/path{i}/get/responses/200/content/application~1json/schema")
+        referrer.set_ref(component)
+        component.add_referrer(referrer)
+        made += [component, referrer]
+    return made
+
+
+def synthetic(n):
+    return {'openapi': '3.0.0',
+            'paths': {f"/path{i}": {'get': {'responses': {'200': {'$ref': f"#/components/responses/response{i}"}}}}
+                      for i in range(n)},
+            'components': {'responses': {f"response{i}": {'description': 'ok',
+                                                          'content': {'application/json': {'schema': {
+                                                              '$ref': f"#/components/schemas/schema{i}"}}}}
+                                         for i in range(n)},
+                           'schemas': {f"schema{i}": {'type': 'string'} for i in range(n)}}}
+
+
+def analyze(document, line_index=None):
+    def run():
+        instance = analyzer.Analyzer(ArgParser().parse_args(['-']))
+        try:
+            instance.analyze(document, line_index)
+        except (Warning, Unrecoverable):
+            pass
+        return instance
+    return run
+
+
+def compare(name, fn):
+    peak, retained = measure(fn)
+    with mock.patch.object(analyzer, 'Entry', DictEntry):
+        dict_peak, dict_retained = measure(fn)
+    print(f"{name:50} retained {retained / 1e6:8.2f} MB (was {dict_retained / 1e6:8.2f} MB), "
+          f"peak {peak / 1e6:8.2f} MB (was {dict_peak / 1e6:8.2f} MB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the memory taken by Entry')
+    parser.add_argument('specs', nargs='*', help="spec files (default a synthetic spec)")
+    parser.add_argument('-n', type=int, default=20000, help="entries, and paths of the synthetic spec")
+    args = parser.parse_args(argv)
+
+    slots, _ = measure(lambda: entries(Entry, args.n))
+    dicts, _ = measure(lambda: entries(DictEntry, args.n))
+    print(f"{'Entry':50} {slots / (2 * args.n):8.0f} bytes each (was {dicts / (2 * args.n):8.0f}), "
+          f"{100 * (dicts - slots) / dicts:.0f}% less")
+    if not args.specs:
+        compare(f"analyze, synthetic, {args.n} paths", analyze(synthetic(args.n)))
+    for spec in args.specs:
+        loader = Loader(ArgParser().parse_args([spec]))
+        document = loader.load(spec)
+        compare(f"analyze, {spec}", analyze(document, loader.line_index))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
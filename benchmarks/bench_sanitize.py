@@ -0,0 +1,79 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Times the sanitizing pass of Sanitizer, removing (-r) unused components, alone,
+  on already loaded and analyzed specs, and the whole `--sanitize -r` run
+
+  By default the OpenBanking specs cached by tests/openbanking are used, so
+  run `pytest tests/openbanking` first, or name spec files on the command line:
+
+    python -m benchmarks.bench_sanitize [-n REPEAT] [spec ...]
+"""
+import argparse
+import glob
+import sys
+import time
+
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.exceptions import Unrecoverable
+
+from .bench_analyzer import OPENBANKING_CACHE
+
+
+def bench_sanitize(spec, repeat):
+    """
+      best of the sanitizing pass, and of the whole run, in seconds, and the number removed
+    """
+    args = ArgParser().parse_args([spec, '--sanitize', '--remove', '--lax'])
+    best_pass = best_run = None
+    for _ in range(repeat):
+        sanitizer = Sanitizer(args)
+        start = time.perf_counter()
+        sanitizer.orig_yaml = sanitizer.loader.load(spec)
+        # analyzed, but not yet sanitized
+        sanitizer.sanitizing = False
+        sanitizer._analyze()
+        middle = time.perf_counter()
+        sanitizer._sanitize()
+        end = time.perf_counter()
+        best_pass = end - middle if best_pass is None else min(best_pass, end - middle)
+        best_run = end - start if best_run is None else min(best_run, end - start)
+    return best_pass, best_run, len(sanitizer.analyzer.unused_components)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Sanitizer, --sanitize --remove')
+    parser.add_argument('specs', nargs='*', help="spec files (default OpenBanking cache)")
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    specs = args.specs or sorted(glob.glob(f"{OPENBANKING_CACHE}/*.yaml") + glob.glob(f"{OPENBANKING_CACHE}/*.json"))
+    if not specs:
+        print(f"no specs given, and nothing cached in {OPENBANKING_CACHE}", file=sys.stderr)
+        return 1
+    for spec in specs:
+        try:
+            sanitize_pass, run, removed = bench_sanitize(spec, args.repeat)
+        except Unrecoverable as e:
+            print(f"{spec:70} not sanitized: {e}")
+            continue
+        print(f"{spec:70} {removed:6} removed, pass {sanitize_pass * 1000:10.2f} ms, run {run * 1000:10.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Times, best of REPEAT, and the peak memory traced by tracemalloc, in a run of
+  its own, of Loader.load, Analyzer.analyze, Sanitizer.sanitize (--sanitize -r,
+  so loading, analyzing and removing) and Dumper.dump, on synthetic specs, see
+  generate, of each size, openapi version and format
+
+  The results are written, as JSON, to DIR/<version>-<time>.json, and are
+  compared, phase by phase, with --compare:
+
+    python -m benchmarks.bench_suite [--sizes 1000,5000] [--formats yaml,json] [--versions 2,3]
+                                     [-n REPEAT] [-d DIR] [generate options]
+    python -m benchmarks.bench_suite --compare BEFORE.json AFTER.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from openapi_spec_sanitizer import __version__
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.analyzer import Analyzer
+from openapi_spec_sanitizer.loader import Loader
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.exceptions import Warning
+
+from .generate import add_arguments, generate, spec_of, write
+
+RESULTS = './benchmarks/results'
+
+
+def timed(repeat, setup, fn):
+    """
+      best of repeat, in seconds, and the peak traced, in bytes, of fn(setup())
+    """
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        fn(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def bench_spec(filename, output, repeat):
+    """
+      {phase: (seconds, peak bytes)}
+    """
+    args = ArgParser().parse_args([filename, '--sanitize', '--remove', '--lax', '-o', output])
+    loader = Loader(args)
+    document = loader.load(filename)
+
+    def analyze(analyzer):
+        try:
+            analyzer.analyze(document, loader.line_index)
+        except Warning:
+            pass
+
+    def sanitized():
+        sanitizer = Sanitizer(args)
+        sanitizer.sanitize(filename)
+        # the Dumper won't overwrite the last one
+        if os.path.exists(output):
+            os.remove(output)
+        return sanitizer
+
+    return {'load': timed(repeat, lambda: Loader(args), lambda fresh: fresh.load(filename)),
+            'analyze': timed(repeat, lambda: Analyzer(args), analyze),
+            'sanitize': timed(repeat, lambda: Sanitizer(args), lambda sanitizer: sanitizer.sanitize(filename)),
+            'dump': timed(repeat, sanitized, lambda sanitizer: sanitizer.dump())}
+
+
+def environment():
+    return {'version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'libyaml': bool(getattr(yaml, '__with_libyaml__', False)),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run(args):
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for openapi in args.versions:
+            for paths in args.sizes:
+                spec = spec_of(args, openapi=openapi, paths=paths)
+                document = generate(spec)
+                for spec_format in args.formats:
+                    filename = os.path.join(tmpdir, f"openapi{openapi}-{paths}.{spec_format}")
+                    write(document, filename)
+                    output = os.path.join(tmpdir, f"sanitized.{spec_format}")
+                    size = os.path.getsize(filename)
+                    for phase, (seconds, peak) in bench_spec(filename, output, args.repeat).items():
+                        results.append({'openapi': openapi, 'format': spec_format, 'paths': paths, 'bytes': size,
+                                        'unused': len(spec.unused()), 'phase': phase,
+                                        'seconds': seconds, 'peak': peak})
+                        print(f"openapi {openapi} {spec_format:4} {paths:8} paths {size / 1e6:8.1f} MB "
+                              f"{phase:8} {seconds * 1000:10.1f} ms, peak {peak / 1e6:8.1f} MB", flush=True)
+                del document
+    return {'environment': environment(), 'options': {name: value for name, value in vars(args).items()
+                                                      if name not in ('compare', 'directory')},
+            'results': results}
+
+
+def key(result):
+    return result['openapi'], result['format'], result['paths'], result['phase']
+
+
+def compare(before_file, after_file):
+    with open(before_file, encoding='utf-8') as file:
+        before = json.load(file)
+    with open(after_file, encoding='utf-8') as file:
+        after = json.load(file)
+    print(f"before: {before['environment']['version']}, {before['environment']['time']}, "
+          f"after: {after['environment']['version']}, {after['environment']['time']}")
+    earlier = {key(result): result for result in before['results']}
+    for result in after['results']:
+        was = earlier.get(key(result))
+        if was is None:
+            continue
+        print(f"openapi {result['openapi']} {result['format']:4} {result['paths']:8} paths {result['phase']:8} "
+              f"{was['seconds'] * 1000:10.1f} -> {result['seconds'] * 1000:10.1f} ms "
+              f"({result['seconds'] / was['seconds']:5.2f}x), "
+              f"peak {was['peak'] / 1e6:8.1f} -> {result['peak'] / 1e6:8.1f} MB")
+    return 0
+
+
+def _list(convert):
+    return lambda text: [convert(item) for item in text.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark loading, analyzing, sanitizing and dumping synthetic specs')
+    parser.add_argument('--sizes', type=_list(int), default=[1000, 5000], help="paths, comma separated (default 1000,5000)")
+    parser.add_argument('--formats', type=_list(str), default=['yaml', 'json'], help="yaml, json (default both)")
+    parser.add_argument('--versions', type=_list(int), default=[3], help="openapi versions, 2, 3 (default 3)")
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    parser.add_argument('-d', '--directory', default=RESULTS, help=f"where results are written (default {RESULTS})")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="compare two results files")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.compare:
+        return compare(*args.compare)
+    if any(version not in (2, 3) for version in args.versions):
+        parser.error("--versions are 2, or 3")
+    if any(spec_format not in ('yaml', 'json') for spec_format in args.formats):
+        parser.error("--formats are yaml, or json")
+    try:
+        for openapi in args.versions:
+            for paths in args.sizes:
+                spec_of(args, openapi=openapi, paths=paths)
+    except ValueError as e:
+        parser.error(str(e))
+    # the unused components, found every run, are expected
+    logging.getLogger('openapi_spec_sanitizer').setLevel(logging.ERROR)
+    report = run(args)
+    os.makedirs(args.directory, exist_ok=True)
+    filename = os.path.join(args.directory, f"{__version__}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=1)
+    print(f"results written to {filename}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
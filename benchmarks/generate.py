@@ -0,0 +1,223 @@
+#######################################################################
+# Benchmarks for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+"""
+  Synthetic Swagger 2.0, or OpenAPI 3, specs, of any size, for benchmarks, so
+  nothing need be downloaded
+
+  Each path has a get and a post, referring to a parameter, and responses. Of
+  each kind of component, parameters, responses and schemas, the first are used,
+  the rest, the unused ratio of them, are not, and which those are is known, see
+  Spec.unused. Used schemas form a chain, from the first, referred to by the used
+  responses, with more $refs forward along it, the ref density, so all are reachable.
+  Unused schemas do the same amongst themselves, and may refer to used ones.
+  Cycles are $refs back along a chain. Each schema's $refs are nested depth
+  objects down
+
+    python -m benchmarks.generate [--openapi 2|3] [--paths N] ... -o spec.yaml|spec.json
+"""
+import argparse
+import json
+import random
+import sys
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+
+class Spec:
+    """
+      the parameters of a synthetic spec, see generate
+    """
+    def __init__(self, openapi=3, paths=1000, schemas=None, responses=None, parameters=None,
+                 ref_density=2, depth=2, cycles=0.1, unused=0.1, seed=0):
+        if openapi not in (2, 3):
+            raise ValueError(f"openapi is 2 or 3, not {openapi}")
+        self.openapi = openapi
+        self.paths = paths
+        self.schemas = paths if schemas is None else schemas
+        self.responses = paths if responses is None else responses
+        self.parameters = paths // 2 if parameters is None else parameters
+        self.ref_density = ref_density
+        self.depth = depth
+        self.cycles = cycles
+        self.unused_ratio = unused
+        self.seed = seed
+        operations = 2 * paths
+        for kind, count, per_operation in (('responses', self.responses, ref_density), ('parameters', self.parameters, 1)):
+            if self.used(count) > operations * max(per_operation, 1):
+                raise ValueError(f"too few paths, {paths}, to refer to {self.used(count)} used {kind}")
+
+    def used(self, count):
+        return count - round(count * self.unused_ratio)
+
+    def _pointers(self):
+        if 3 == self.openapi:
+            return '#/components/parameters/', '#/components/responses/', '#/components/schemas/'
+        return '#/parameters/', '#/responses/', '#/definitions/'
+
+    def unused(self):
+        """
+          json pointers, as the Analyzer reports them, of the unused components
+        """
+        found = set()
+        for prefix, name, count in zip(self._pointers(), ('parameter', 'response', 'schema'),
+                                       (self.parameters, self.responses, self.schemas)):
+            found.update(f"{prefix[1:]}{name}{i}" for i in range(self.used(count), count))
+        return found
+
+
+def generate(spec):
+    """
+      the document, plain dicts and lists, nothing shared, so nothing aliased when dumped
+    """
+    rng = random.Random(spec.seed)
+    parameter_ref, response_ref, schema_ref = spec._pointers()
+    density = max(spec.ref_density, 1)
+
+    def ref(prefix, name, i):
+        return {'$ref': f"{prefix}{name}{i}"}
+
+    def group(i, count):
+        """
+          the range of the group, used or unused, schema i is in
+        """
+        used = spec.used(count)
+        return (0, used) if i < used else (used, count)
+
+    def schema(i):
+        start, end = group(i, spec.schemas)
+        targets = []
+        if i + 1 < end:
+            targets.append(i + 1)
+            targets += [rng.randrange(i + 1, end) for _ in range(spec.ref_density - 1)]
+        if i > start and rng.random() < spec.cycles:
+            targets.append(rng.randrange(start, i))
+        if i >= spec.used(spec.schemas) and spec.used(spec.schemas) and rng.random() < 0.5:
+            # unused may refer to used
+            targets.append(rng.randrange(0, spec.used(spec.schemas)))
+        leaf = {'type': 'object',
+                'properties': {'id': {'type': 'integer', 'format': 'int64'},
+                               'name': {'type': 'string', 'description': f"name of schema{i}"}}}
+        for n, target in enumerate(targets):
+            if n % 2:
+                leaf['properties'][f"ref{n}"] = {'type': 'array', 'items': ref(schema_ref, 'schema', target)}
+            else:
+                leaf['properties'][f"ref{n}"] = ref(schema_ref, 'schema', target)
+        node = leaf
+        for level in range(spec.depth):
+            node = {'type': 'object', 'properties': {f"level{level}": node}}
+        return node
+
+    def response(i):
+        target = i % spec.used(spec.schemas) if spec.used(spec.schemas) else None
+        if i >= spec.used(spec.responses) and spec.schemas:
+            target = rng.randrange(spec.schemas)
+        if target is None:
+            return {'description': f"response{i}"}
+        if 3 == spec.openapi:
+            return {'description': f"response{i}",
+                    'content': {'application/json': {'schema': ref(schema_ref, 'schema', target)}}}
+        return {'description': f"response{i}", 'schema': ref(schema_ref, 'schema', target)}
+
+    def parameter(i):
+        if 3 == spec.openapi:
+            return {'name': f"parameter{i}", 'in': 'query', 'required': False, 'schema': {'type': 'string'}}
+        return {'name': f"parameter{i}", 'in': 'query', 'required': False, 'type': 'string'}
+
+    used_responses = spec.used(spec.responses)
+    used_parameters = spec.used(spec.parameters)
+    paths = {}
+    operation = 0
+    for p in range(spec.paths):
+        path_item = {}
+        for method in ('get', 'post'):
+            item = {'operationId': f"{method}Path{p}", 'summary': f"{method} path{p}"}
+            if used_parameters:
+                item['parameters'] = [ref(parameter_ref, 'parameter', operation % used_parameters)]
+            if used_responses:
+                item['responses'] = {str(200 + d): ref(response_ref, 'response', (operation * density + d) % used_responses)
+                                     for d in range(density)}
+            else:
+                item['responses'] = {'200': {'description': 'ok'}}
+            path_item[method] = item
+            operation += 1
+        paths[f"/path{p}/{{id}}"] = path_item
+
+    parameters = {f"parameter{i}": parameter(i) for i in range(spec.parameters)}
+    responses = {f"response{i}": response(i) for i in range(spec.responses)}
+    schemas = {f"schema{i}": schema(i) for i in range(spec.schemas)}
+    info = {'title': f"synthetic, {spec.paths} paths", 'version': '1.0.0'}
+    if 3 == spec.openapi:
+        return {'openapi': '3.0.3', 'info': info, 'paths': paths,
+                'components': {'parameters': parameters, 'responses': responses, 'schemas': schemas}}
+    return {'swagger': '2.0', 'info': info, 'paths': paths,
+            'parameters': parameters, 'responses': responses, 'definitions': schemas}
+
+
+def write(document, filename):
+    """
+      as JSON, for a .json filename, else YAML
+    """
+    with open(filename, 'w', encoding='utf-8') as file:
+        if filename.endswith('.json'):
+            json.dump(document, file, indent=2)
+        else:
+            yaml.dump(document, file, Dumper=SafeDumper, sort_keys=False, default_flow_style=False)
+
+
+def add_arguments(parser):
+    parser.add_argument('--openapi', type=int, choices=[2, 3], default=3, help="2 for swagger 2.0 (default 3)")
+    parser.add_argument('--paths', type=int, default=1000, help="paths, each with a get and a post (default 1000)")
+    parser.add_argument('--schemas', type=int, default=None, help="schemas (default paths)")
+    parser.add_argument('--responses', type=int, default=None, help="responses (default paths)")
+    parser.add_argument('--parameters', type=int, default=None, help="parameters (default paths / 2)")
+    parser.add_argument('--ref-density', type=int, default=2,
+                        help="$refs from each schema, and responses of each operation (default 2)")
+    parser.add_argument('--depth', type=int, default=2, help="objects a schema's $refs are nested in (default 2)")
+    parser.add_argument('--cycles', type=float, default=0.1, help="ratio of schemas referring back (default 0.1)")
+    parser.add_argument('--unused', type=float, default=0.1, help="ratio of components unused (default 0.1)")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def spec_of(args, **overrides):
+    options = dict(openapi=args.openapi, paths=args.paths, schemas=args.schemas, responses=args.responses,
+                   parameters=args.parameters, ref_density=args.ref_density, depth=args.depth,
+                   cycles=args.cycles, unused=args.unused, seed=args.seed)
+    options.update(overrides)
+    return Spec(**options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic OpenAPI spec')
+    add_arguments(parser)
+    parser.add_argument('-o', '--output', required=True, help="spec file, .yaml or .json")
+    args = parser.parse_args(argv)
+    try:
+        spec = spec_of(args)
+    except ValueError as e:
+        parser.error(str(e))
+    write(generate(spec), args.output)
+    print(f"{args.output}: {spec.paths} paths, {len(spec.unused())} unused components")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,10 +16,14 @@
 ########################################################################
 
 import logging
+import sys
+import oyaml as yaml
 
 from .sanitizer import Sanitizer
 from .exceptions import DirtyYamlWarning, Unrecoverable
 from .argparser import ArgParser
+from .batch import Batch, BatchResult, expand_sources, is_batch
+from .report import ReportFormat, report_fragment, write_report
 
 
 def main():
@@ -37,22 +41,137 @@ def main():
         logger.setLevel(logging.INFO)
         console.setLevel(logging.INFO)
     logger.addHandler(console)
-    logger.info(f"filename   : {args.filename}")
+    if args.serve:
+        return main_serve(args, logger)
+    if is_batch(args.filenames):
+        if args.watch:
+            logger.error("Main: -w/--watch can't be used with a batch")
+            return BatchResult.ERROR
+        if args.profile:
+            logger.error("Main: --profile can't be used with a batch, profile a spec at a time")
+            return BatchResult.ERROR
+        if args.analyze_jobs > 1:
+            logger.error("Main: --analyze-jobs can't be used with a batch, --jobs shares out its files")
+            return BatchResult.ERROR
+        if args.baseline is not None:
+            logger.error("Main: --baseline can't be used with a batch, it is of one spec")
+            return BatchResult.ERROR
+        return main_batch(args, logger)
+    if args.watch:
+        return main_watch(args, logger)
+    filename = args.filenames[0]
+    logger.info(f"filename   : {filename}")
     logger.info(f"sanitizing : {args.sanitize}")
-    sanitizer = Sanitizer(args)
+    report_format = ReportFormat(args.report_format)
+    # stdout is for the report, unless it's text
+    say = print if ReportFormat.TEXT == report_format else logger.warning
+    sanitizer = None
     epitaph = ''
+    message = ''
+    status = BatchResult.CLEAN
+    profiler = start_profile(args) if args.profile else None
     try:
-        sanitizer.sanitize(args.filename)
-        sanitizer.dump("test.yaml")
+        sanitizer = Sanitizer(args)
+        sanitizer.sanitize(filename)
+        if args.sanitize:
+            sanitizer.dump()
     except DirtyYamlWarning as e:
         # these don't percolate up (yet!)
-        print(f"Main: Tolerable issue with {e}")
-    except Unrecoverable as e:
+        status = BatchResult.DIRTY
+        message = str(e)
+        say(f"Main: Tolerable issue with {e}")
+    except (Unrecoverable, OSError, yaml.YAMLError, ValueError) as e:
+        # as for each spec of a batch, see sanitize_one
+        status = BatchResult.ERROR
         epitaph = ' with errors'
-        print(f"Main: Unrecoverable error with {e}")
-    logger.info(sanitizer.report())
+        message = str(e)
+        say(f"Main: Unrecoverable error with {e}")
+    if args.profile:
+        stop_profile(args, profiler, sanitizer, logger)
+    if sanitizer is not None and ReportFormat.TEXT == report_format:
+        logger.info(sanitizer.report())
+    elif sanitizer is not None:
+        report = report_fragment(report_format, sanitizer.analyzer, filename, BatchResult.NAMES[status], message)
+        write_report(report_format, [BatchResult(filename, status, message, report)], sys.stdout)
     logger.info(f"finished{epitaph}")
+    return status
+
+
+def start_profile(args):
+    """
+      traces memory, for the peaks of Metrics, and, given --profile-stats, starts cProfile
+    """
+    import tracemalloc
+    tracemalloc.start()
+    if args.profile_stats is None:
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(args, profiler, sanitizer, logger):
+    """
+      the Metrics of the run, to stderr, stdout being for reports
+    """
+    import tracemalloc
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile_stats)
+        logger.info(f"Main: cProfile stats written to {args.profile_stats}")
+    tracemalloc.stop()
+    if sanitizer is not None:
+        print(sanitizer.metrics.report(), file=sys.stderr)
+
+
+def main_batch(args, logger):
+    if args.output is not None:
+        logger.error("Main: -o/--output can't be used with a batch, each file is dumped to <root>.san<ext>")
+        return BatchResult.ERROR
+    filenames = expand_sources(args.filenames)
+    batch = Batch(args)
+    logger.info(f"batch      : {len(filenames)} files, {batch.jobs} jobs")
+    logger.info(f"sanitizing : {args.sanitize}")
+    results = batch.run(filenames)
+    report_format = ReportFormat(args.report_format)
+    logger.info(Batch.report(results, ReportFormat.TEXT == report_format))
+    if ReportFormat.TEXT != report_format:
+        write_report(report_format, results, sys.stdout)
+    exit_code = Batch.exit_code(results)
+    logger.info(f"finished{' with errors' if BatchResult.ERROR == exit_code else ''}")
+    return exit_code
+
+
+def main_watch(args, logger):
+    # as each of the modes, only imported if it's used, see tests/default/test_imports.py
+    from .watch import Watcher
+    try:
+        watcher = Watcher(args, args.filenames[0])
+    except FileNotFoundError as e:
+        logger.error(f"Main: {e}")
+        return BatchResult.ERROR
+    result = watcher.run()
+    return result.status if result is not None else BatchResult.CLEAN
+
+
+def main_serve(args, logger):
+    from .service import Service
+    service = Service(args)
+    try:
+        address = service.start()
+    except OSError as e:
+        logger.error(f"Main: unable to serve: {e}")
+        service.stop()
+        return BatchResult.ERROR
+    logger.info(f"serving    : {address}, {service.jobs} jobs, ctrl-c to stop")
+    try:
+        service.serve()
+    except KeyboardInterrupt:
+        pass
+    logger.info("finished")
+    return BatchResult.CLEAN
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
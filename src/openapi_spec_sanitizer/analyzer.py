@@ -16,18 +16,27 @@
 ########################################################################
 
 import collections
-import re
 import logging
-import pprint
-from packaging.version import Version, InvalidVersion
 from enum import Enum
 
 from .stateful import Stateful
-from .entry import Entry
+from .baseline import Baseline
+from .entry import Entry, NO_REFERRERS
+from .metrics import Metrics
+from .lineindex import COMPONENT_PARENTS
+from .version import InvalidVersion, parse_version
 from .exceptions import UnsupportedYamlException, InvalidYamlException, DirtyYamlWarning
 
 logger = logging.getLogger('openapi_spec_sanitizer')
 
+# the Analyzer whose shards worker processes extract, see Analyzer._analyze_sharded,
+# set before they are forked, so they share its document rather than being sent it
+_sharded = None
+
+
+def _extract_shard(key):
+    return _sharded._extract(key)
+
 
 class State(Enum):
     UNKNOWN = 1
@@ -38,74 +47,189 @@ class State(Enum):
 
 class Analyzer(Stateful):
     class Undefined:
+        __slots__ = ('path', 'referrers')
+
         def __init__(self, path, referrers):
             self.path = path
             self.referrers = referrers
 
         def __str__(self):
             stringy = f"Cmponent Path: {self.path}"
-            for referrer in self.referrers:
-                stringy += f"\n  Referrer: {referrer}"
+            for referrer in self.referrers.values():
+                stringy += f"\n  Referrer: {referrer.node_path}"
             return stringy
 
-    def __init__(self, args):
+    def __init__(self, args, metrics=None):
         super().__init__(State.UNKNOWN)
+        self.metrics = metrics if metrics is not None else Metrics()
         self._debug = args.debug
         self.document = None
-        self.referrers = collections.defaultdict(set)
+        self.line_index = None
+        self.resolver = None
+        # node_path : Entry, the first string made for each path being the one kept, see _get_node
         self.components = {}
         self.unused_components = None
         self.undefined_components = None
+        # watching keeps, for each shard of the document, what it contributed, see reanalyze
+        self._incremental = getattr(args, 'watch', False)
+        self._cascade = getattr(args, 'cascade', False)
+        self._shards = None
+        # worker processes extracting the shards of the document, see _analyze_sharded
+        self._jobs = getattr(args, 'analyze_jobs', None) or 1
+        # given a Baseline, the findings are only those new since, see _compare
+        self.baseline = None
+        self.snapshot = None
+        self.changes = None
 
     def report(self):
-        stringy = "------------------------ Analyzer Report ----------------\n"
+        """
+          the findings as text, see report.ReportFormat for others
+        """
+        lines = ["------------------------ Analyzer Report ----------------"]
         if self._debug:
-            if self.referrers is not None:
-                stringy += "Referrers:\n"
-                for referrer in self.referrers:
-                    stringy += '  ' + pprint.pformat(referrer) + '\n'
-            stringy += "Components: \n"
-            for component in self.components:
-                stringy += '  ' + pprint.pformat(component) + '\n'
+            lines.append("Referrers:")
+            lines += [f"  {entry.node_path!r}" for entry in self._entries() if entry.referrers]
+            lines.append("Components: ")
+            lines += [f"  {entry.node_path!r}" for entry in self._entries()]
         if self.undefined_components:
-            stringy += "Undefined components \n"
-            for undefined_component in self.undefined_components:
-                stringy += '  ' + pprint.pformat(undefined_component) + '\n'
+            lines.append("Undefined components ")
+            lines += [f"  {undefined_component!r}" for undefined_component in self.undefined_components]
         if self.unused_components:
-            stringy += "Uunused components \n"
+            lines.append("Uunused components ")
             for key, unused_component in self.unused_components.items():
-                stringy += f'  path: {key}\n'
-                stringy += '         ' + pprint.pformat(unused_component) + '\n'
-        stringy += "----------------------- ~Analyzer Report ----------------\n"
-        return stringy
+                lines.append(f"  path: {key}")
+                lines.append(f"         {unused_component!r}")
+        if self.changes is not None and (self.changes['now_unused'] or self.changes['now_used']):
+            lines.append("Reachability changed since the baseline ")
+            lines += [f"  now unused: {path}" for path in sorted(self.changes['now_unused'])]
+            lines += [f"  now used: {path}" for path in sorted(self.changes['now_used'])]
+        lines.append("----------------------- ~Analyzer Report ----------------\n")
+        return '\n'.join(lines)
+
+    def forget(self):
+        """
+          the findings of the document last analyzed, but not its component graph, see reanalyze
+        """
+        self.unused_components = None
+        self.undefined_components = None
+        self.snapshot = None
+        self.changes = None
+
+    def counts(self):
+        """
+          of the component graph: nodes, its entries, those that are $refs, declared
+          components, and the findings
+        """
+        nodes = refs = components = 0
+        for entry in self._entries():
+            nodes += 1
+            if entry.ref is not None:
+                refs += 1
+            if entry.is_declared() and entry.is_component():
+                components += 1
+        return {'nodes': nodes, 'refs': refs, 'components': components,
+                'unused': len(self.unused_components or ()), 'undefined': len(self.undefined_components or ())}
+
+    def as_dict(self):
+        """
+          the findings, as plain data, for json, none if the analysis didn't get that far
+        """
+        return {'unused': [{'path': path, 'line': entry.line,
+                            **({'generation': entry.generation} if entry.generation is not None else {})}
+                           for path, entry in (self.unused_components or {}).items()],
+                'undefined': [{'path': path,
+                               'referrers': [{'path': referrer.node_path, 'line': referrer.line}
+                                             for referrer in undefined.referrers.values()]}
+                              for path, undefined in (self.undefined_components or {}).items()],
+                **({'baseline': {'now_unused': sorted(self.changes['now_unused']),
+                                 'now_used': sorted(self.changes['now_used'])}} if self.changes is not None else {})}
 
     def _swagger_ver(self):
         self.needs(State.LOADED, "_swagger_ver")
         if 'swagger' in self.document:
-            if 2.0 == self.document['swagger']:
+            # a string, as the spec has it, or a float, as unquoted yaml has it
+            if self.document['swagger'] in ('2.0', 2.0):
                 self._version = 2
             else:
                 raise InvalidYamlException(f"swagger version failed: must be '2.0', but is {self.document['swagger']}")
         elif 'openapi' in self.document:
             try:
-                # self._version = int(parse_version(self.document['openapi']).major)
-                self._version = Version(self.document['openapi']).major
+                self._version = parse_version(self.document['openapi'])[0]
                 if (self._version != 3):
                     raise InvalidYamlException(f"openapi version failed, must be 3, but is {self._version}")
-            except (AttributeError, InvalidVersion) as exc:
+            except InvalidVersion as exc:
                 raise InvalidYamlException(f"version failed whilst parsing '{self.document['openapi']}'") from exc
         else:
             raise InvalidYamlException("swagger or openapi key not found")
 
-    def analyze(self, document):
+    def analyze(self, document, line_index=None, resolver=None):
+        """
+           line_index  LineIndex of the document's mappings, from the Loader (if any)
+           resolver    Resolver of $refs to other documents, without one they are unsupported
+        """
         # we may have analyzed so reset state
         self._state = State.LOADED
         self.document = document
+        self.line_index = line_index
+        self.resolver = resolver
+        self.components = {}
+        self._referenced_documents = set()
+        self._shards = None
+        self.forget()
+        self._swagger_ver()
+        with self.metrics.phase('analyze'):
+            if self._incremental and isinstance(self.document, dict):
+                self._shards = {}     # key : [(entry, path), ...] the entries each shard declared
+                self._paths = {}      # node_path : path, of the entries in _shards
+                for key, subtree in self._split((), self.document):
+                    self._add_shard(key, subtree)
+            elif self._jobs > 1 and isinstance(self.document, dict):
+                self._analyze_sharded()
+            else:
+                self._analyze(self.document, self.line_index)
+            self._analyze_referenced()
+        self._conclude()
+
+    def reanalyze(self, document, line_index=None):
+        """
+           analyze, again, a changed version of the document last analyzed
+
+           Only the shards (see _split) that differ from the last version are walked
+           again, the entries the old version of each contributed having been removed
+           first. Unchanged shards are left be, the lines of their entries, which might
+           have moved, are only looked up for those reported.
+           Falls back to analyze when there is nothing to go on, the version has changed,
+           or other documents are referred to (they might no longer be)
+        """
+        version = getattr(self, '_version', None)
+        previous = self.document
+        self.document = document
+        self.line_index = line_index
+        self._state = State.LOADED
         self._swagger_ver()
-        root_path = ()
-        self._analyze(self.document, root_path)
+        if (self._shards is None or version != self._version or not isinstance(document, dict) or
+                (self.resolver is not None and self.resolver.documents)):
+            return self.analyze(document, line_index, self.resolver)
+        walked = 0
+        with self.metrics.phase('analyze'):
+            for key, subtree in self._changes((), previous, document):
+                self._remove_shards(key)
+                if subtree is not self.MISSING:
+                    for shard_key, shard in self._split(key, subtree):
+                        self._add_shard(shard_key, shard)
+                        walked += 1
+            self._analyze_referenced()
+        logger.debug(f"Analyzer: reanalyzed {walked} of {len(self._shards)} shards")
+        self._conclude(relocate=True)
+
+    def _conclude(self, relocate=False):
         self._state = State.PARSED
-        self._capture()
+        with self.metrics.phase('capture'):
+            self._capture()
+            if relocate:
+                self._relocate(self._entries() if self._debug else self._reported())
+            if self.baseline is not None:
+                self._compare()
 
         if (self.undefined_components):
             logger.debug(f"Analyzer failed with {len(self.undefined_components)} undefined_components")
@@ -114,82 +238,493 @@ class Analyzer(Stateful):
             logger.debug(f"Analyzer failed with {len(self.unused_components)} unused_components")
             raise DirtyYamlWarning("Unused elements")
 
-    def _ref_remote(self, value):
-        regex = re.compile(r'^(.+\.yaml)', re.IGNORECASE)
-        m = re.match(regex, value)
-        if m:
-            return m.group(1)
+    def _analyze_referenced(self):
+        """
+           Analyzes the documents referred to, and those they refer to, and so on,
+           a wave at a time, each wave loaded concurrently, into the one component graph
+        """
+        while self._referenced_documents:
+            pending, self._referenced_documents = self._referenced_documents, set()
+            for doc_key, (document, line_index) in self.resolver.load(pending).items():
+                self._analyze(document, line_index, doc_key)
+        if self.resolver is not None and self.resolver.documents:
+            self._resolve_fragments()
+
+    def _resolve_fragments(self):
+        """
+           A $ref to another document can be to anywhere in it, not just to a component:
+           what it refers to, if it is there, is a fragment, a component of its own, and
+           of everything in it not in a component, or, if it is in a component (or
+           fragment), part of that one, its referrers then referring to that one instead.
+           Shortest first, so a fragment's enclosing ones are known
+        """
+        fragments = {}      # node_path : Entry
+        candidates = sorted((entry for entry in self._entries()
+                             if entry.is_component() and entry.component is not entry and '#' in entry.node_path),
+                            key=lambda entry: len(entry.node_path))
+        for entry in candidates:
+            doc_key, _, pointer = entry.node_path.rpartition('#')
+            loaded = self.resolver.documents.get(doc_key)
+            if loaded is None:
+                continue
+            document, line_index = loaded
+            located = self._locate(document, pointer)
+            if located is None:
+                continue
+            enclosing = self._enclosing(entry.node_path)
+            if enclosing is not None:
+                for referrer in entry.referrers.values():
+                    referrer.set_ref(enclosing)
+                    enclosing.add_referrer(referrer)
+                if entry.is_declared():
+                    # itself a $ref
+                    entry.tipe = 'Referrer'
+                    entry.referrers = NO_REFERRERS
+                else:
+                    del self.components[entry.node_path]
+                continue
+            container, key, node = located
+            if not entry.is_declared():
+                entry.declare(self._line(line_index, node))
+            entry.locate(container, key)
+            entry.set_component(entry)
+            fragments[entry.node_path] = entry
+        if not fragments:
+            return
+        for entry in self._entries():
+            if entry.component is not None and entry.component.is_document():
+                path = entry.node_path
+                while not path.endswith('#'):
+                    path = path.rpartition('/')[0]
+                    fragment = fragments.get(path)
+                    if fragment is not None:
+                        entry.set_component(fragment)
+                        break
+
+    def _enclosing(self, node_path):
+        """
+           the declared component, or fragment, node_path is in, if any
+        """
+        while not node_path.endswith('#'):
+            node_path = node_path.rpartition('/')[0]
+            entry = self.components.get(node_path)
+            if entry is not None and entry.is_component() and entry.component is entry and entry.is_declared():
+                return entry
         return None
 
+    @staticmethod
+    def _locate(document, pointer):
+        """
+           (container, key, node) of the json pointer in document, None if it isn't there
+        """
+        if not pointer.startswith('/'):
+            return None
+        container = key = None
+        node = document
+        for token in pointer[1:].split('/'):
+            token = token.replace('~1', '/').replace('~0', '~')
+            if isinstance(node, dict):
+                if token not in node:
+                    if not token.isdigit() or int(token) not in node:
+                        return None
+                    token = int(token)
+            elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+                token = int(token)
+            else:
+                return None
+            container, key, node = node, token, node[token]
+        return container, key, node
+
+    def _def_path(self, value, doc_key, node_path, line_no):
+        """
+           normalised $ref, for the root document just the json pointer: remove '#' from
+           the start of reference, for other documents '<doc key>#<json pointer>'
+        """
+        uri, _, pointer = value.partition('#')
+        target_key = doc_key
+        if uri:
+            if self.resolver is None:
+                raise UnsupportedYamlException("Unsupported Remote reference, " +
+                                               f"node_path {node_path}, line_no {line_no}"
+                                               )
+            target_key = self.resolver.resolve(doc_key, uri)
+            if target_key == self.resolver.root_key:
+                target_key = None
+            elif target_key not in self.resolver.documents:
+                self._referenced_documents.add(target_key)
+        if target_key is None:
+            return pointer
+        return f"{target_key}#{pointer}"
+
     def _get_node(self, node_path, tipe):
-        if node_path in self.components:
-            return self.components[node_path]
-        node = Entry(tipe, node_path)
-        self.components[node_path] = node
+        """
+           the Entry of node_path, made if there isn't one, the path, as made again and
+           again by the walk, being let go of if there is
+        """
+        node = self.components.get(node_path)
+        if node is None:
+            node = self.components[node_path] = Entry(tipe, node_path)
         return node
 
-    def _analyze(self, dictionary, parent_path, parent_component=None):   # noqa: C901
+    def _entries(self):
+        return self.components.values()
+
+    MISSING = object()
+
+    def _split_depth(self, key):
         """
-           parent_path       path to parent, a tuple of breadcrumbs
-           parent_component  the component this is part of (if any)
+           shards are each path item, each component, and each of the other top level values
         """
-        if type(dictionary) == list:
-            for i, element in enumerate(dictionary):
-                self._analyze(element, parent_path+(i,), parent_component)
-        elif type(dictionary) == dict:
-            node_path = ''.join(['/' + str(node) for node in parent_path])
-            line_no = dictionary.get('__line__', None)
-            curr_parent_component = parent_component
-            curr_node = None
+        if not key:
+            return 1
+        if 'paths' == key[0]:
+            return 2
+        if 3 == self._version:
+            return 3 if 'components' == key[0] else 1
+        return 2 if key[0] in COMPONENT_PARENTS else 1
 
-            if (self._is_component(parent_path)):
+    def _splittable(self, key, subtree):
+        return len(key) < self._split_depth(key) and type(subtree) is dict and '$ref' not in subtree
+
+    def _split(self, key, subtree):
+        """
+           (key, subtree) shards of subtree, at key, in the order they are in the document
+        """
+        pending = [(key, subtree)]
+        while pending:
+            key, subtree = pending.pop()
+            if self._splittable(key, subtree):
+                pending.extend((key + (child_key, ), child) for child_key, child in reversed(list(subtree.items())))
+            else:
+                yield key, subtree
+
+    def _changes(self, key, old, new):
+        """
+           (key, new subtree, or MISSING) of where the old and new versions of the document
+           differ, going no deeper than the shards. Equal subtrees are compared, in C,
+           without looking inside them
+        """
+        pending = [(key, old, new)]
+        while pending:
+            key, old, new = pending.pop()
+            if self._splittable(key, old) and self._splittable(key, new):
+                for child_key in dict.fromkeys([*old, *new]):
+                    old_child = old.get(child_key, self.MISSING)
+                    new_child = new.get(child_key, self.MISSING)
+                    if old_child is self.MISSING or new_child is self.MISSING or old_child != new_child:
+                        pending.append((key + (child_key, ), old_child, new_child))
+            else:
+                yield key, new
+
+    def _add_shard(self, key, subtree):
+        contributions = []
+        self._merge(self._visit(subtree, list(key), self.line_index), self.document, contributions=contributions)
+        self._shards[key] = contributions
+        for entry, path in contributions:
+            self._paths[entry.node_path] = path
+
+    def _remove_shards(self, key):
+        """
+           undoes what the shards at, or under, key contributed to the component graph
+        """
+        if len(key) >= self._split_depth(key):
+            keys = [key] if key in self._shards else []
+        else:
+            keys = [shard_key for shard_key in self._shards if shard_key[:len(key)] == key]
+        for shard_key in keys:
+            for entry, _ in self._shards.pop(shard_key):
+                self._paths.pop(entry.node_path, None)
+                if entry.ref is not None:
+                    entry.ref.remove_referrer(entry)
+                    self._prune(entry.ref)
+                    entry.set_ref(None)
+                entry.undeclare()
+                self._prune(entry)
+
+    def _prune(self, entry):
+        """
+           forgets an entry nothing declares, or refers to
+        """
+        if not entry.is_declared() and not entry.referrers and entry.ref is None:
+            self.components.pop(entry.node_path, None)
+
+    def _reported(self):
+        for entry in self.unused_components.values():
+            yield entry
+        for undefined in self.undefined_components.values():
+            yield from undefined.referrers.values()
+
+    def _relocate(self, entries):
+        """
+           the lines of entries, in the current version of the document
+        """
+        for entry in entries:
+            path = self._paths.get(entry.node_path)
+            if path is None:
+                continue
+            node = self.document
+            for key in path:
+                node = node[key]
+            entry.line = self._line(self.line_index, node)
+
+    def _analyze(self, document, line_index, doc_key=None):
+        """
+           doc_key is None for the root document, else the Resolver's key for the document,
+           whose entries are '<doc key>#<json pointer>', and which is itself a 'Document'
+           entry, the component of everything in it not in a component
+        """
+        doc_node = None
+        if doc_key is not None:
+            doc_node = self._get_node(f"{doc_key}#", 'Document')
+            doc_node.declare(1)
+            doc_node.set_component(doc_node)
+        found = self._visit(document, [], line_index, doc_key)
+        self._merge(found, document, doc_key, doc_node)
+
+    def _analyze_sharded(self):
+        """
+           as _analyze, of the root document, its shards (see _split) walked by worker
+           processes, see _extract, and what they found merged, in the order of the shards,
+           so the component graph is just as the one walk would have made it
+
+           The workers are forked, sharing the document, and LineIndex, rather than
+           being sent them, and send back only plain tuples, so only with the fork start
+           method, else the document is walked here
+        """
+        import multiprocessing
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.debug("Analyzer: walking the document, as worker processes can't be forked")
+            return self._analyze(self.document, self.line_index)
+        import gc
+        from concurrent.futures import ProcessPoolExecutor
+        global _sharded
+        keys = [key for key, _ in self._split((), self.document)]
+        if self.line_index is not None:
+            self.line_index.order()
+        jobs = min(self._jobs, len(keys))
+        logger.debug(f"Analyzer: extracting {len(keys)} shards in {jobs} worker processes")
+        # the workers' collections leave the pages of what is already here, shared, be
+        gc.freeze()
+        _sharded = self
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork')) as executor:
+                for found in executor.map(_extract_shard, keys, chunksize=max(1, len(keys) // (jobs * 8))):
+                    self._merge(found, self.document)
+        finally:
+            _sharded = None
+            gc.unfreeze()
+
+    def _extract(self, shard_key):
+        """
+           what _visit finds in the shard at shard_key of the root document, in a worker process
+        """
+        document = self.document
+        for breadcrumb in shard_key:
+            document = document[breadcrumb]
+        return list(self._visit(document, list(shard_key), self.line_index))
+
+    def _visit(self, document, path, line_index, doc_key=None):   # noqa: C901
+        """
+           Walks the document, or a subtree of it at path, depth first, with an explicit
+           stack rather than recursion, yielding what is to be added to the component
+           graph, as plain tuples, see _merge, so they can be sent from a worker process,
+           or merged as they are found, rather than all being held at once:
+             ('Component', node_path, line, path)
+             ('Referrer', node_path, line, $ref, node_path of its component, or None, path)
+             ('Nested', node_path, node_path of the component it is in)
+           path is a single breadcrumbs buffer, trimmed and extended as the walk
+           moves about, and only turned into a json pointer for components and $refs
+           Stack entries are (depth of parent, key, node, the node_path of the component
+           node is part of (if any))
+           doc_key is that of the document, as for _analyze, whose entries are all part of
+           the document's component, if not in one of its components
+        """
+        component_depth = 3 if 3 == self._version else 2
+        prefix = '' if doc_key is None else f"{doc_key}#"
+        doc_path = None if doc_key is None else prefix
+        if path:
+            stack = [(len(path) - 1, path.pop(), document, doc_path)]
+        else:
+            stack = [(0, None, document, doc_path)]
+        while stack:
+            depth, key, node, parent_component = stack.pop()
+            del path[depth:]
+            if key is not None:
+                path.append(key)
+            tipe = type(node)
+            if tipe is list:
+                depth = len(path)
+                stack.extend((depth, i, node[i], parent_component) for i in range(len(node) - 1, -1, -1))
+            elif tipe is dict:
+                node_path = None
+                line_no = None
+                curr_parent_component = parent_component
+                if component_depth == len(path) and self._is_component(path):
+                    node_path = prefix + self._pointer(path)
+                    line_no = self._line(line_index, node)
+                    if parent_component is not None and parent_component != doc_path:
+                        yield ('Nested', node_path, parent_component)
+                        return
+                    yield ('Component', node_path, line_no, tuple(path))
+                    curr_parent_component = node_path
+                if '$ref' in node:
+                    if node_path is None:
+                        node_path = prefix + self._pointer(path)
+                        line_no = self._line(line_index, node)
+                    yield ('Referrer', node_path, line_no, node['$ref'], curr_parent_component, tuple(path))
+                depth = len(path)
+                stack.extend((depth, child_key, child, curr_parent_component)
+                             for child_key, child in reversed(list(node.items()))
+                             if '$ref' != child_key)
+
+    def _merge(self, found, document, doc_key=None, doc_node=None, contributions=None):
+        """
+           adds what _visit found, in document, to the component graph
+           contributions, if given, gets (entry, path) of each entry declared
+        """
+        components = {}     # node_path : Entry, of the components found, and the document's
+        if doc_node is not None:
+            components[doc_node.node_path] = doc_node
+        for item in found:
+            if 'Component' == item[0]:
+                _, node_path, line_no, path = item
+                container = document
+                for breadcrumb in path[:-1]:
+                    container = container[breadcrumb]
                 curr_node = self._get_node(node_path, 'Component')
                 curr_node.declare(line_no)
-                if parent_component is not None:
-                    raise InvalidYamlException(f"This {node_path} is a component, " +
-                                               f"but a parent {parent_component} is a component")
-                curr_parent_component = curr_node
+                curr_node.locate(container, path[-1])
                 # implicit: this is a component
-                curr_node.set_component(curr_parent_component)
-            for key in dictionary.keys():
-                if ('$ref' == key):
-                    value = dictionary[key]
-                    if self._ref_remote(value):
-                        raise UnsupportedYamlException("Unsupported Remote reference, " +
-                                                       f"node_path {node_path}, line_no {line_no}"
-                                                       )
-                    # normalise ref and def: remove '#' from start of reference
-                    def_path = dictionary[key][1:]
-                    component_node = self._get_node(def_path, 'Component')
-                    curr_node = self._get_node(node_path, 'Referrer')
-                    curr_node.declare(line_no)
-                    curr_node.set_ref_path(def_path)
-                    component_node.add_referrer(node_path, curr_node)
-                    if curr_parent_component is not None:
-                        curr_node.set_component(curr_parent_component)
-                    self.referrers[def_path].add(curr_node)
-                elif '__line__' != key:
-                    # SafeLineLoader adds __line__ element
-                    self._analyze(dictionary[key], parent_path+(key, ), curr_parent_component)
-                else:
-                    # just a normal element, just an innocent element
-                    pass
+                curr_node.set_component(curr_node)
+                components[node_path] = curr_node
+            elif 'Referrer' == item[0]:
+                _, node_path, line_no, value, component_path, path = item
+                def_path = self._def_path(value, doc_key, node_path, line_no)
+                # a $ref to a whole document
+                component_node = self._get_node(def_path, 'Document' if def_path.endswith('#') else 'Component')
+                curr_node = self._get_node(node_path, 'Referrer')
+                curr_node.declare(line_no)
+                curr_node.set_ref(component_node)
+                component_node.add_referrer(curr_node)
+                if component_path is not None:
+                    curr_node.set_component(components[component_path])
+            else:
+                _, node_path, component_path = item
+                raise InvalidYamlException(f"This {node_path} is a component, " +
+                                           f"but a parent {components[component_path]} is a component")
+            if contributions is not None:
+                contributions.append((curr_node, path))
+
+    @staticmethod
+    def _line(line_index, node):
+        return line_index.line(node) if line_index is not None else None
+
+    @staticmethod
+    def _pointer(path):
+        return ''.join(['/' + str(breadcrumb) for breadcrumb in path])
+
+    def _reachability(self):
+        """
+           Works out which entries are required, in O(V+E), and safe with cycles
+
+           The component graph has an edge from each component to whatever its
+           referrers refer to. Referrers outside of any component are the roots,
+           and a single multi-source breadth first search from what they refer to
+           finds every required component. A referrer is required if it is a root,
+           or its component is required
+           The search marks the entries themselves, what is required of those it doesn't
+           reach being worked out after
+        """
+        graph = collections.defaultdict(list)   # component Entry : [the Entry each of its $refs refers to, ...]
+        queue = collections.deque()
+        for entry in self._entries():
+            entry.set_required(False)
+            if entry.ref is None:
+                continue
+            if entry.is_part_of_component():
+                graph[entry.component].append(entry.ref)
+            else:
+                queue.append(entry.ref)
+        for target in queue:
+            target.set_required(True)
+        while queue:
+            for target in graph.get(queue.popleft(), ()):
+                if not target.required:
+                    target.set_required(True)
+                    queue.append(target)
+        for entry in self._entries():
+            if entry.is_component():
+                continue
+            if entry.is_part_of_component():
+                entry.set_required(entry.component.required)
+            else:
+                entry.set_required(True)
 
     def _capture(self):
         self.at_least(State.PARSED, "_capture")
+        self._reachability()
 
-        self.undefined_components = {def_path: self.Undefined(def_path, component.referrers)
-                                     for def_path, component in self.components.items()
-                                     if (component.is_required(set())
+        self.undefined_components = {component.node_path: self.Undefined(component.node_path, component.referrers)
+                                     for component in self._entries()
+                                     if (component.is_required()
                                          and not component.is_declared()
                                          and component.is_component()
                                          )
                                      }
 
-        self.unused_components = {def_path: component
-                                  for def_path, component in self.components.items()
+        self.unused_components = {component.node_path: component
+                                  for component in self._entries()
                                   if not component.is_required() and component.is_declared() and component.is_component()
                                   }
+        if self._cascade:
+            self._generations()
+
+    def _compare(self):
+        """
+           keeps only the findings that are new since the baseline, the snapshot being of them all
+        """
+        self.snapshot = Baseline((entry.node_path for entry in self._entries()
+                                  if entry.is_component() and entry.is_declared() and entry.is_required()),
+                                 self.unused_components, self.undefined_components)
+        self.changes = self.baseline.compare(self.snapshot)
+        self.unused_components = {path: entry for path, entry in self.unused_components.items()
+                                  if path in self.changes['unused']}
+        self.undefined_components = {path: undefined for path, undefined in self.undefined_components.items()
+                                     if path in self.changes['undefined']}
+
+    def _generations(self):
+        """
+           The unused components are everything unreachable, found in one pass, which
+           removing only what nothing refers to would take several rounds to find:
+           the generation of each is the round it would be found in. Kahn's algorithm,
+           on the unused part of the component graph, peels them off a generation at a
+           time. Those in cycles are never free of referrers, so come last, together
+        """
+        unused = self.unused_components
+        referred_by = {path: set() for path in unused}    # path : unused components referring to it
+        refers_to = collections.defaultdict(set)           # path : unused components it refers to
+        for path, component in unused.items():
+            component.generation = None
+            for referrer in component.referrers.values():
+                source = referrer.component.node_path if referrer.component is not None else None
+                if source in unused and source != path:
+                    referred_by[path].add(source)
+                    refers_to[source].add(path)
+        generation = 1
+        current = [path for path, sources in referred_by.items() if not sources]
+        while current:
+            following = []
+            for path in current:
+                unused[path].generation = generation
+                for target in refers_to[path]:
+                    referred_by[target].discard(path)
+                    if not referred_by[target]:
+                        following.append(target)
+            current = following
+            generation += 1
+        for component in unused.values():
+            if component.generation is None:
+                component.generation = generation
 
     def get_undefined_components(self):
         self.at_least(State.PARSED, "get_undefined_components")
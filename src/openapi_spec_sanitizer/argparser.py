@@ -25,11 +25,34 @@ class ArgParser():
         parser = argparse.ArgumentParser(description='Sanitize OpenAPI.')
         self.argParser = parser
         load_group = parser.add_argument_group('YAML, or JSON, Loading Options')
-        load_group.add_argument('filename',
-                                help="openapi specification: file path or url (YAML, or JSON) ")
-        # TODO
-        # load_group.add_argument("-c", "--cache", dest = 'cachedir', type=str,
-        #                    help="cache remote files (loaded from from url) locally")
+        load_group.add_argument('filenames',
+                                metavar='filename',
+                                nargs='*',
+                                help="openapi specification: file path or url (YAML, or JSON). " +
+                                     "More than one, or a directory, glob or @manifest file, is a batch")
+        load_group.add_argument("-c", "--cache", dest='cachedir', type=str,
+                                help="cache remote files (loaded from from url) locally, in CACHEDIR")
+        load_group.add_argument("--cache-ttl", type=int, default=300,
+                                help="seconds a cached remote file is used before revalidating it (default 300)")
+        load_group.add_argument("--cache-size", type=int, default=256,
+                                help="MB of cached remote files, and of cached documents, kept, "
+                                     "least recently used are evicted (default 256)")
+        load_group.add_argument("--parse-cache", action='store_true',
+                                help="cache loaded documents in CACHEDIR, skipping parsing of unchanged files")
+        load_group.add_argument('--loader-backend',
+                                choices=['auto', 'c', 'python'],
+                                default='auto',
+                                help="YAML parser: libyaml (c), pure python, or auto: c if available (default auto)")
+        load_group.add_argument('--json-backend',
+                                choices=['stream', 'stdlib'],
+                                help="JSON parser: incremental, with line numbers (stream), "
+                                     "or the json module, faster but without (default stream when reporting, "
+                                     "or splicing, otherwise stdlib)")
+        load_group.add_argument('--no-scan',
+                                dest='scan',
+                                action='store_false',
+                                help="when only reporting, load the whole document, rather than scanning "
+                                     "it for just the components and $refs (default scan)")
 
         sanitizing_group = parser.add_argument_group('Sanitizing Options')
         sanitizing_group.add_argument('-s', '--sanitize',
@@ -48,6 +71,26 @@ class ArgParser():
                                action='store_true',
                                help="Sanitize mode is to remove component"
                                )
+        mod_group.add_argument('--cascade',
+                               action='store_true',
+                               help="sanitize, removing unused components, reporting the generation each "
+                                    "would have been found in by removing, and rerunning, again and again "
+                                    "(implies -l)"
+                               )
+
+        sanitizing_group.add_argument('--dumper-backend',
+                                      choices=['auto', 'c', 'python'],
+                                      default='auto',
+                                      help="YAML emitter: libyaml (c), pure python, or auto: c if available "
+                                           "(default auto)")
+        sanitizing_group.add_argument('--compact',
+                                      action='store_true',
+                                      help="dump JSON without indentation, or spaces")
+        sanitizing_group.add_argument('--splice',
+                                      action='store_true',
+                                      help="copy the spec file, splicing in just the tags, or removals, "
+                                           "rather than dumping all of it again, so formatting and "
+                                           "comments are kept (default dump)")
 
         openapi_format_group = sanitizing_group.add_mutually_exclusive_group()
         openapi_format_group.add_argument('-y', '--yaml',
@@ -59,8 +102,56 @@ class ArgParser():
                                           help="Default is JSON format"
                                           )
 
+        analysis_group = parser.add_argument_group('Analysis Options')
+        analysis_group.add_argument('--analyze-jobs', metavar='JOBS', type=int, default=1,
+                                    help="worker processes walking a spec, its path items and components shared "
+                                         "out between them, for huge specs (default 1, walked in this process)")
+        analysis_group.add_argument('--baseline', metavar='FILE', type=str, default=None,
+                                    help="report only the unused, and undefined, components that weren't in the "
+                                         "baseline FILE, and those whose use has changed, recording it if it "
+                                         "doesn't exist yet")
+        analysis_group.add_argument('--update-baseline', action='store_true',
+                                    help="record the findings in the baseline FILE, after comparing with it")
+
+        batch_group = parser.add_argument_group('Batch Options')
+        batch_group.add_argument('--jobs', type=int, default=None,
+                                 help="worker processes for a batch (default: cpu count)")
+
+        watch_group = parser.add_argument_group('Watch Options')
+        watch_group.add_argument('-w', '--watch',
+                                 action='store_true',
+                                 help="report again whenever the spec, or a file it refers to, changes, "
+                                      "reanalyzing only what has changed")
+        watch_group.add_argument('--watch-interval', type=float, default=0.5,
+                                 help="seconds between checks for changes (default 0.5)")
+
+        service_group = parser.add_argument_group('Service Options')
+        service_group.add_argument('--serve',
+                                   action='store_true',
+                                   help="serve a json API, POST a spec to /analyze, rather than taking filenames")
+        service_group.add_argument('--host', type=str, default='127.0.0.1',
+                                   help="address to serve on (default 127.0.0.1)")
+        service_group.add_argument('--port', type=int, default=8080,
+                                   help="port to serve on (default 8080)")
+        service_group.add_argument('--socket', type=str, default=None,
+                                   help="serve on a unix socket, at this path, rather than a port")
+        service_group.add_argument('--queue-size', type=int, default=64,
+                                   help="specs waiting, or being analyzed, before more are turned away (default 64)")
+        service_group.add_argument('--service-cache', type=int, default=256,
+                                   help="results kept, for specs sent again (default 256)")
+
         parser.add_argument("-o", "--output", type=str,
                             help="output file name for sanitized YAML, or JSON")
+        parser.add_argument('--report-format',
+                            choices=['text', 'json', 'sarif'],
+                            default='text',
+                            help="report findings as text, logged, or as JSON, or SARIF, to stdout (default text)")
+        parser.add_argument('--profile',
+                            action='store_true',
+                            help="report the wall, and cpu, time, and peak memory (traced), of each phase, "
+                                 "load, analyze, capture, sanitize and dump, and counts of the component graph")
+        parser.add_argument('--profile-stats', metavar='FILE', type=str, default=None,
+                            help="profile, as --profile, also writing cProfile stats to FILE, see python -m pstats")
         parser.add_argument('-l', '--lax',
                             dest='warnings_are_ok',
                             action='store_true',
@@ -74,4 +165,37 @@ class ArgParser():
                             help='show the version number and exit')
 
     def parse_args(self, args=None, namespace=None):
-        return self.argParser.parse_args(args, namespace)
+        parsed = self.argParser.parse_args(args, namespace)
+        if parsed.profile_stats is not None:
+            parsed.profile = True
+        if parsed.profile and (parsed.serve or parsed.watch):
+            self.argParser.error("--profile profiles sanitizing a spec, once, not watching, or serving")
+        if parsed.cascade:
+            parsed.sanitize = True
+            parsed.delete = True
+            # there being unused components is the point
+            parsed.warnings_are_ok = True
+        if parsed.serve and parsed.filenames:
+            self.argParser.error("--serve takes specs from requests, not filenames")
+        if not parsed.serve and not parsed.filenames:
+            self.argParser.error("the following arguments are required: filename")
+        if parsed.queue_size < 1:
+            self.argParser.error("--queue-size must be at least 1")
+        if parsed.parse_cache and parsed.cachedir is None:
+            self.argParser.error("--parse-cache needs a -c/--cache CACHEDIR")
+        if parsed.jobs is not None and parsed.jobs < 1:
+            self.argParser.error("--jobs must be at least 1")
+        if parsed.analyze_jobs < 1:
+            self.argParser.error("--analyze-jobs must be at least 1")
+        if parsed.analyze_jobs > 1 and (parsed.serve or parsed.watch):
+            self.argParser.error("--analyze-jobs shares out a spec, once, not watching, or serving")
+        if parsed.update_baseline and parsed.baseline is None:
+            self.argParser.error("--update-baseline needs a --baseline FILE")
+        if parsed.baseline is not None and (parsed.sanitize or parsed.serve or parsed.watch):
+            self.argParser.error("--baseline only reports, once, it can't be used with -s/--sanitize, "
+                                 "-w/--watch or --serve")
+        if parsed.splice and parsed.compact:
+            self.argParser.error("--compact dumps all of the spec again, --splice doesn't")
+        if parsed.watch and parsed.sanitize:
+            self.argParser.error("-w/--watch only reports, it can't be used with -s/--sanitize")
+        return parsed
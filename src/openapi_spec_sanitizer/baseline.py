@@ -0,0 +1,70 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Baseline']
+
+from . import __version__
+from .exceptions import InvalidFileException
+
+
+class Baseline:
+    """
+      What the Analyzer found of a spec, for later runs to be compared with, see --baseline:
+      the paths of its declared components, used, and unused, and of those undefined
+
+      Saved as a line of JSON, sorted lists of the paths, so loading one, and comparing
+      with it, are a json.loads, and a few set operations, rather than analyzing the
+      spec it was made of again
+    """
+    FORMAT = 1
+
+    def __init__(self, used=(), unused=(), undefined=()):
+        self.used = set(used)
+        self.unused = set(unused)
+        self.undefined = set(undefined)
+
+    def compare(self, current):
+        """
+          what has changed, in current, a Baseline of the spec now, since this one, as sets of paths:
+            unused      unused now, but not then
+            undefined   undefined now, but not then
+            now_unused  used then, unused now
+            now_used    unused then, used now
+        """
+        return {'unused': current.unused - self.unused,
+                'undefined': current.undefined - self.undefined,
+                'now_unused': current.unused & self.used,
+                'now_used': current.used & self.unused}
+
+    def save(self, filename):
+        import json
+        snapshot = {'format': self.FORMAT, 'version': __version__, 'used': sorted(self.used),
+                    'unused': sorted(self.unused), 'undefined': sorted(self.undefined)}
+        with open(filename, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    @classmethod
+    def load(cls, filename):
+        import json
+        try:
+            with open(filename, 'r', encoding='utf-8') as file:
+                snapshot = json.loads(file.read())
+        except (OSError, ValueError) as exc:
+            raise InvalidFileException(f"unable to load baseline {filename}: {exc}") from exc
+        if not isinstance(snapshot, dict) or cls.FORMAT != snapshot.get('format'):
+            raise InvalidFileException(f"{filename} is not a baseline, of format {cls.FORMAT}")
+        return cls(snapshot['used'], snapshot['unused'], snapshot['undefined'])
@@ -0,0 +1,176 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Batch', 'BatchResult', 'expand_sources', 'is_batch']
+
+import glob
+import logging
+import os
+import re
+import oyaml as yaml
+
+from .sanitizer import Sanitizer
+from .exceptions import Warning, Unrecoverable
+from .report import report_fragment
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+SPEC_EXTENSIONS = ('.yaml', '.json')
+
+
+def _is_glob(source):
+    return re.search(r'[*?[]', source) is not None
+
+
+def is_batch(sources):
+    """
+      more than one source, or a directory, glob, or @manifest
+    """
+    if len(sources) != 1:
+        return True
+    source = sources[0]
+    return source.startswith('@') or os.path.isdir(source) or (_is_glob(source) and bool(glob.glob(source)))
+
+
+def expand_sources(sources):
+    """
+      spec files from sources, each of which is a:
+        file path, or url
+        directory, searched recursively for .yaml and .json files
+        glob, recursive with **
+        @manifest, a file of sources, one a line, # comments
+      duplicates are dropped, order is kept
+    """
+    filenames = []
+    for source in sources:
+        if source.startswith('@'):
+            with open(source[1:], 'r', encoding='utf-8') as manifest:
+                lines = [line.strip() for line in manifest]
+            filenames += expand_sources([line for line in lines if line and not line.startswith('#')])
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                filenames += [os.path.join(root, file) for file in sorted(files)
+                              if os.path.splitext(file)[1] in SPEC_EXTENSIONS]
+        elif _is_glob(source):
+            filenames += sorted(glob.glob(source, recursive=True))
+        else:
+            filenames.append(source)
+    return list(dict.fromkeys(filenames))
+
+
+class BatchResult:
+    CLEAN = 0
+    DIRTY = 1
+    ERROR = 2
+    NAMES = {CLEAN: 'clean', DIRTY: 'dirty', ERROR: 'error'}
+
+    def __init__(self, filename, status, message='', report='', output=None):
+        self.filename = filename
+        self.status = status
+        self.message = message
+        self.report = report
+        self.output = output
+
+    def __str__(self):
+        stringy = f"{self.filename}: {self.NAMES[self.status]}"
+        if self.message:
+            stringy += f", {self.message}"
+        if self.output is not None:
+            stringy += f", sanitized to {self.output}"
+        return stringy
+
+
+def sanitize_one(sanitizer, filename, incremental=False):
+    """
+      sanitize, and if sanitizing dump, a file with a (reusable) Sanitizer,
+      the report being in the Sanitizer's report format, see report_fragment
+    """
+    status = BatchResult.CLEAN
+    message = ''
+    output = None
+    try:
+        sanitizer.sanitize(filename, incremental)
+        if sanitizer.sanitizing:
+            output = sanitizer.dump()
+    except Warning as e:
+        status = BatchResult.DIRTY
+        message = str(e)
+    except (Unrecoverable, OSError, yaml.YAMLError, ValueError) as e:
+        # a spec that doesn't parse is an error of its own, not of the batch
+        status = BatchResult.ERROR
+        message = str(e)
+    report = report_fragment(sanitizer.report_format, sanitizer.analyzer, filename, BatchResult.NAMES[status], message)
+    return BatchResult(filename, status, message, report, output)
+
+
+# each worker process has one Sanitizer, reused for all of the files it is given
+_worker_sanitizer = None
+
+
+def _init_worker(args):
+    global _worker_sanitizer
+    _worker_sanitizer = Sanitizer(args)
+
+
+def _sanitize_in_worker(filename):
+    return sanitize_one(_worker_sanitizer, filename)
+
+
+class Batch:
+    """
+      Sanitizes many spec files, in a pool of worker processes
+    """
+    def __init__(self, args):
+        self.args = args
+        self.jobs = args.jobs or os.cpu_count() or 1
+
+    def run(self, filenames):
+        """
+          BatchResults, in the order of filenames
+        """
+        if self.jobs == 1 or len(filenames) == 1:
+            sanitizer = Sanitizer(self.args)
+            return [sanitize_one(sanitizer, filename) for filename in filenames]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(filenames)),
+                                 initializer=_init_worker,
+                                 initargs=(self.args, )) as executor:
+            return list(executor.map(_sanitize_in_worker, filenames))
+
+    @staticmethod
+    def report(results, details=True):
+        """
+          details, the report of each file, if they are text
+        """
+        stringy = ''
+        for result in results if details else ():
+            stringy += f"======================== {result.filename}\n{result.report}"
+        counts = [sum(1 for result in results if result.status == status)
+                  for status in (BatchResult.CLEAN, BatchResult.DIRTY, BatchResult.ERROR)]
+        stringy += f"======================== Batch: {len(results)} files, "
+        stringy += f"{counts[0]} clean, {counts[1]} dirty, {counts[2]} with errors\n"
+        for result in results:
+            stringy += f"  {result}\n"
+        return stringy
+
+    @staticmethod
+    def exit_code(results):
+        """
+          the worst of the results: 0 all clean, 1 some dirty, 2 some with errors
+        """
+        return max((result.status for result in results), default=BatchResult.CLEAN)
@@ -0,0 +1,240 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['UrlCache', 'ParseCache']
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from . import __version__
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+
+class UrlCache:
+    """
+      On disk cache of remote (url) spec files
+
+      Content is stored once, by its sha256, under objects/, and each url has a
+      small json metadata file under urls/ naming its object, along with the
+      ETag and Last-Modified the server sent.
+      Within the ttl a cached url is used as is, after that it is revalidated
+      with a conditional request, and only downloaded again if it has changed.
+      When the objects grow beyond max_size the least recently used urls are evicted
+    """
+    def __init__(self, cachedir, ttl=300, max_size=256 * 1024 * 1024):
+        self.cachedir = Path(cachedir)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._objects = self.cachedir / 'objects'
+        self._urls = self.cachedir / 'urls'
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._urls.mkdir(parents=True, exist_ok=True)
+
+    def fetch(self, url):
+        """
+          the content of url, as bytes, from the cache if possible
+        """
+        meta_path = self._urls / f"{self._digest(url.encode('utf-8'))}.json"
+        meta = self._read_meta(meta_path)
+        content = self._read_object(meta['object']) if meta is not None else None
+        now = time.time()
+        if content is not None and now - meta['fetched'] < self.ttl:
+            logger.debug(f"UrlCache: fresh {url}")
+        else:
+            content, meta = self._download(url, meta if content is not None else None, content)
+            meta['fetched'] = now
+        meta['accessed'] = now
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        self._evict()
+        return content
+
+    def _download(self, url, meta, content):
+        request = urllib.request.Request(url)
+        if meta is not None:
+            if meta.get('etag'):
+                request.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                request.add_header('If-Modified-Since', meta['last_modified'])
+        try:
+            with urllib.request.urlopen(request) as response:
+                content = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if 304 != e.code or meta is None:
+                raise
+            logger.debug(f"UrlCache: not modified {url}")
+            return content, meta
+        logger.debug(f"UrlCache: downloaded {url}")
+        digest = self._digest(content)
+        object_path = self._objects / digest
+        if not object_path.exists():
+            self._write_atomic(object_path, content)
+        meta = {'url': url,
+                'object': digest,
+                'size': len(content),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified')
+                }
+        return content, meta
+
+    def _evict(self):
+        metas = []
+        for meta_path in self._urls.glob('*.json'):
+            meta = self._read_meta(meta_path)
+            if meta is not None:
+                metas.append((meta.get('accessed', 0), meta_path, meta))
+        sizes = {}
+        for _, _, meta in metas:
+            sizes[meta['object']] = meta['size']
+        total = sum(sizes.values())
+        if total <= self.max_size:
+            return
+        # least recently used first, but never the url just fetched
+        metas.sort(key=lambda accessed_meta: accessed_meta[0])
+        live = {}
+        for _, _, meta in metas:
+            live[meta['object']] = live.get(meta['object'], 0) + 1
+        for _, meta_path, meta in metas[:-1]:
+            if total <= self.max_size:
+                break
+            logger.debug(f"UrlCache: evicting {meta['url']}")
+            # another process evicting too might have got there first, only what this one removes counts
+            try:
+                meta_path.unlink()
+            except FileNotFoundError:
+                continue
+            live[meta['object']] -= 1
+            if 0 == live[meta['object']]:
+                try:
+                    (self._objects / meta['object']).unlink()
+                except FileNotFoundError:
+                    continue
+                total -= meta['size']
+
+    def _read_object(self, digest):
+        try:
+            return (self._objects / digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            return json.loads(meta_path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _digest(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def _write_atomic(self, path, content):
+        """
+          concurrent runs sharing a cache never see a partial file
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cachedir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class ParseCache:
+    """
+      On disk cache of loaded documents, and their LineIndex, as pickles
+
+      Keyed by the sha256 of the source, how it was loaded (format, and Safe or
+      Full loader) and the package version, so a hit is exactly what loading
+      would have produced, without any parsing.
+      A pickle's mtime is when it was last used, when they grow beyond max_size
+      the least recently used are evicted, as UrlCache's urls are.
+      Only use a cache directory others can't write to: unpickling runs code
+    """
+    def __init__(self, cachedir, max_size=256 * 1024 * 1024):
+        self.cachedir = Path(cachedir)
+        self.max_size = max_size
+        self._parsed = self.cachedir / 'parsed'
+        self._parsed.mkdir(parents=True, exist_ok=True)
+
+    def key(self, content, mode):
+        digest = hashlib.sha256(content)
+        digest.update(f"\0{mode}\0{__version__}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+          (document, line_index), or None if not cached
+        """
+        path = self._parsed / f"{key}.pickle"
+        try:
+            with open(path, 'rb') as file:
+                cached = pickle.load(file)
+            os.utime(path)
+            return cached
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            logger.warning(f"ParseCache: ignoring unreadable {key}: {e}")
+            return None
+
+    def put(self, key, document, line_index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cachedir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump((document, line_index), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._parsed / f"{key}.pickle")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict(key)
+
+    def _evict(self, key):
+        pickles = []
+        for path in self._parsed.glob('*.pickle'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            pickles.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in pickles)
+        if total <= self.max_size:
+            return
+        # least recently used first, but never the document just put
+        pickles.sort(key=lambda used_pickle: used_pickle[0])
+        for _, size, path in pickles:
+            if total <= self.max_size:
+                break
+            if f"{key}.pickle" == path.name:
+                continue
+            logger.debug(f"ParseCache: evicting {path.stem}")
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
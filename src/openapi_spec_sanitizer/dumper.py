@@ -15,23 +15,93 @@
 # limitations under the License.
 ########################################################################
 
-__all__ = ['Loader']
+__all__ = ['Dumper', 'DumperBackend']
 
 import oyaml as yaml
-import json
+import io
+import logging
+import mmap
 import os
+from enum import Enum
 from pathlib import Path
 
-from .exceptions import InvalidFileException
-from .loader import Loader, OpenapiFormat
+from .exceptions import InvalidFileException, UnsupportedYamlException
+from .loader import OpenapiFormat, map_file
+from .splicer import UnspliceableException
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+# libyaml bindings are optional, as for the Loader
+# oyaml registers its order keeping dict representer with them too
+_CDumper = getattr(yaml, 'CDumper', None)
+
+# writes are gathered into chunks this big
+BUFFER_SIZE = 1024 * 1024
+
+
+class DumperBackend(Enum):
+    AUTO = 'auto'
+    C = 'c'
+    PYTHON = 'python'
 
 
 class Dumper:
     def __init__(self, loader, args):
         self.loader = loader
+        self.output_filename = args.output
+        self.compact = args.compact
+        self.backend = self._select_backend(DumperBackend(args.dumper_backend))
+        self.yaml_dumper = _CDumper if DumperBackend.C == self.backend else yaml.Dumper
+        logger.debug(f"Dumper: using {self.backend.value} backend, {self.yaml_dumper.__name__}")
 
-    def dump(self, filename):
-        filename = self.output_filename
+    @staticmethod
+    def _select_backend(backend):
+        """
+          auto prefers libyaml's emitter, falling back to pure python
+        """
+        c_available = _CDumper is not None
+        if DumperBackend.AUTO == backend:
+            return DumperBackend.C if c_available else DumperBackend.PYTHON
+        if DumperBackend.C == backend and not c_available:
+            raise UnsupportedYamlException("dumper backend 'c' requested but PyYAML was built without libyaml")
+        return backend
+
+    def dump(self, document, filename=None):
+        """
+          filename defaults to the output filename, else <loaded filename root>.san<ext>
+          returns the filename dumped to
+        """
+        filename = self._output_filename(filename)
+        with open(filename, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as file:
+            self.write(document, file)
+        return filename
+
+    def splice(self, splicer, filename=None):
+        """
+          as dump, but the file loaded, memory mapped, with splicer's edits spliced in,
+          see Splicer, raising UnspliceableException, before writing anything, if they can't be
+          The Loader's mapping of the file is spliced, if it kept it, rather than mapping it again
+        """
+        source = self.loader.get_filename()
+        if source is None:
+            raise UnspliceableException("only a spec loaded from a file can be spliced")
+        filename = self._output_filename(filename)
+        buffer = self.loader.buffer
+        if buffer is None:
+            with open(source, 'rb') as file:
+                buffer = map_file(file)
+        try:
+            patches = splicer.patches(buffer)
+            with open(filename, 'wb', buffering=BUFFER_SIZE) as output:
+                splicer.splice(buffer, patches, output)
+        finally:
+            if buffer is not self.loader.buffer and isinstance(buffer, mmap.mmap):
+                buffer.close()
+        return filename
+
+    def _output_filename(self, filename):
+        if filename is None:
+            filename = self.output_filename
         loader_filename = self.loader.get_filename()
         if filename is None:
             if loader_filename is None:
@@ -43,9 +113,24 @@ class Dumper:
                 raise InvalidFileException(f"will not overwrite original file {filename}")
         if Path(filename).exists():
             raise InvalidFileException(f"will not overwrite existing file {filename}")
+        return filename
+
+    def write(self, document, file):
+        """
+          document to a text stream, in the format it was loaded from, emitted a piece
+          at a time, so the stream should be buffered
+        """
+        if OpenapiFormat.YAML == self.loader.get_openapi_format():
+            yaml.dump(document, file, Dumper=self.yaml_dumper, width=1000)
+        elif OpenapiFormat.JSON == self.loader.get_openapi_format():
+            import json
+            if self.compact:
+                # only one shot encoding gets the json module's C encoder
+                file.write(json.dumps(document, ensure_ascii=False, separators=(',', ':')))
+            else:
+                json.dump(document, file, ensure_ascii=False, indent=4)
 
-        with open(filename, 'w', encoding='utf-8') as file:
-            if OpenapiFormat.YAML == self.loader.get_openapi_format():
-                yaml.dump(self.orig_yaml, file, width=1000)
-            elif OpenapiFormat.JSON == self.loader.get_openapi_format():
-                json.dump(self.orig_yaml, file, ensure_ascii=False, indent=4)
+    def dumps(self, document):
+        file = io.StringIO()
+        self.write(document, file)
+        return file.getvalue()
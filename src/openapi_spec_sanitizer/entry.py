@@ -17,34 +17,60 @@
 
 __all__ = ["Entry"]
 
+from types import MappingProxyType
+
+# shared by every Entry until it has a referrer of its own, most never do
+NO_REFERRERS = MappingProxyType({})
+
 
 class Entry:
+    # there is one for every component and $ref, so no __dict__ each
+    __slots__ = ('tipe', 'node_path', 'line', 'ref', 'referrers', 'component', 'declared', 'required',
+                 'container', 'key', 'generation')
+
     def __init__(self, tipe, node_path, line=None):
+        """
+          node_path is the Analyzer's key for the Entry, the one string kept for the path
+        """
         self.tipe = tipe
         self.node_path = node_path
         self.line = line
-        self.ref_path = None
-        self.referrers = {}    # node_path : Entry
+        self.ref = None        # the Entry the $ref refers to
+        self.referrers = NO_REFERRERS    # node_path : Entry
         self.component = None  # the component this Entry is under
         self.declared = False
         self.required = None
+        self.container = None  # where a declared component is, as container[key]
+        self.key = None
+        self.generation = None  # of an unused component, see Analyzer._generations
 
     def __repr__(self):
         return (f"Type: {self.tipe}, " +
                 f"path: {self.node_path}, " +
                 f"line: {self.line}, is component? {self.is_component()}, " +
-                f"is declared? {self.declared}, is required? {self.required}")
+                f"is declared? {self.declared}, is required? {self.required}" +
+                (f", generation: {self.generation}" if self.generation is not None else ""))
 
     def is_declared(self):
         return self.declared
 
-    def set_ref_path(self, ref_path):
-        self.ref_path = ref_path
+    def set_ref(self, ref):
+        self.ref = ref
 
     def declare(self, line):
         self.line = line
         self.declared = True
 
+    def undeclare(self):
+        self.line = None
+        self.declared = False
+        self.container = None
+        self.key = None
+
+    def locate(self, container, key):
+        self.container = container
+        self.key = key
+
     def set_component(self, component):
         self.component = component
 
@@ -54,28 +80,23 @@ class Entry:
     def is_component(self):
         return self.tipe == 'Component'
 
-    def add_referrer(self, node_path, node):
-        self.referrers[node_path] = node
-
-    def is_required(self, cache=set()):
-        if self.required is not None:
-            return self.required
-        if self.is_component():
-            pass
-        elif self.is_part_of_component():
-            if self.component.node_path not in cache:
-                cache.add(self.component.node_path)
-                if self.component.is_required(cache):
-                    self.required = True
-                    return self.required
-        else:
-            self.required = True
-            return self.required
-        for referrer_path, referrer in self.referrers.items():
-            if referrer.node_path not in cache:
-                cache.add(referrer.node_path)
-                if referrer.is_required(cache):
-                    self.required = True
-                    return self.required
-        self.required = False
+    def is_document(self):
+        return self.tipe == 'Document'
+
+    def add_referrer(self, node):
+        if self.referrers is NO_REFERRERS:
+            self.referrers = {}
+        self.referrers[node.node_path] = node
+
+    def remove_referrer(self, node):
+        if self.referrers:
+            self.referrers.pop(node.node_path, None)
+
+    def set_required(self, required):
+        self.required = required
+
+    def is_required(self):
+        """
+          as worked out by the Analyzer, None until then
+        """
         return self.required
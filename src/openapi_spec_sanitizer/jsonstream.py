@@ -0,0 +1,314 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['JsonEvents', 'JsonStreamError', 'load_json']
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+from .lineindex import LineIndex, COMPONENT_PARENTS, COMPONENT_GRANDPARENTS
+
+# whitespace, then a token: punctuation, the start of a string, a literal, or a number
+TOKEN_REGEX = re.compile(r'[ \t\r\n]*(?:([{}\[\]:,])|(")|(true|false|null)|(-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?))')
+LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+class JsonStreamError(json.JSONDecodeError):
+    """
+      a JSONDecodeError, but with a position in the whole text, rather than in a chunk of it
+    """
+    def __init__(self, msg, line, column, pos):
+        ValueError.__init__(self, f"{msg}: line {line} column {column} (char {pos})")
+        self.msg = msg
+        self.doc = None
+        self.pos = pos
+        self.lineno = line
+        self.colno = column
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.lineno, self.colno, self.pos)
+
+
+class JsonEvents:
+    """
+      Incremental JSON parser, yielding events
+
+      Reads the stream a chunk at a time, so holds no more than a chunk, and the
+      current string, of the text. Strings are decoded by the json module's scanstring.
+      Events are (event, value, offset), event being one of:
+        'start_map', 'end_map', 'start_array', 'end_array', 'key', 'scalar'
+      and offset where, in the text, the event's token starts: position(offset)
+      turns that into (line, column), counting lines only when asked
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        """
+           source is a text, or utf-8 bytes, stream, or the text, as str or utf-8 bytes
+        """
+        # a character can be split between chunks of bytes
+        self._decoder = None
+        if hasattr(source, 'read'):
+            self._stream = source
+            self._buf = ''
+            self._eof = False
+        else:
+            self._stream = None
+            self._buf = source.decode('utf-8') if isinstance(source, (bytes, bytearray)) else source
+            self._eof = True
+        self._chunk_size = chunk_size
+        self._pos = 0
+        self._base = 0          # offset in the text of _buf[0]
+        self._counted = 0       # offset in the text up to which lines have been counted
+        self._line = 1
+        self._line_start = 0    # offset in the text of the start of _line
+
+    def position(self, offset):
+        """
+          (line, column) of offset, which must not be before one already asked for,
+          or before the event being handled
+        """
+        buf_offset = offset - self._base
+        counted = self._counted - self._base
+        if buf_offset > counted:
+            newlines = self._buf.count('\n', counted, buf_offset)
+            if newlines:
+                self._line += newlines
+                self._line_start = self._base + self._buf.rfind('\n', counted, buf_offset) + 1
+            self._counted = offset
+        return self._line, offset - self._line_start + 1
+
+    def _error(self, msg, offset=None):
+        if offset is None:
+            offset = self._base + self._pos
+        line, column = self.position(offset)
+        return JsonStreamError(msg, line, column, offset)
+
+    def _fill(self):
+        """
+          read another chunk, returning False at the end of the stream
+        """
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        while isinstance(chunk, (bytes, bytearray)):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder('utf-8')()
+            final = not chunk
+            chunk = self._decoder.decode(chunk, final)
+            if chunk or final:
+                break
+            chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # count the lines of the text about to be dropped
+        if self._counted < self._base + self._pos:
+            self.position(self._base + self._pos)
+        self._base += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _token(self):
+        """
+          (kind, value, offset), kind being the punctuation character, 'string',
+          'literal' or 'number', or None at the end of the text
+        """
+        while True:
+            buf = self._buf
+            if len(buf) - self._pos < 64 and self._fill():
+                continue
+            match = TOKEN_REGEX.match(buf, self._pos)
+            if match is None:
+                if self._fill():
+                    continue
+                rest = buf[self._pos:]
+                start = self._base + len(buf) - len(rest.lstrip(' \t\r\n'))
+                if rest.strip(' \t\r\n') == '':
+                    self._pos = len(buf)
+                    return None, None, start
+                raise self._error("Expecting value", start)
+            index = match.lastindex
+            end = match.end()
+            if 1 == index:
+                self._pos = end
+                return match.group(1), None, self._base + end - 1
+            if 2 == index:
+                start = end - 1
+                try:
+                    value, end = scanstring(buf, end, True)
+                except json.JSONDecodeError:
+                    # the string might carry on in the next chunk
+                    self._pos = start
+                    if self._fill():
+                        continue
+                    raise self._error("Unterminated string", self._base + start)
+                self._pos = end
+                return 'string', value, self._base + start
+            if 4 == index:
+                if end == len(buf) and self._fill():
+                    # the number might carry on in the next chunk
+                    continue
+                number = match.group(4)
+                self._pos = end
+                start = self._base + end - len(number)
+                if '.' in number or 'e' in number or 'E' in number:
+                    return 'number', float(number), start
+                return 'number', int(number), start
+            self._pos = end
+            literal = match.group(3)
+            return 'literal', LITERALS[literal], self._base + end - len(literal)
+
+    def __iter__(self):   # noqa: C901
+        stack = []      # '{' or '[' of each open container
+        expect_value = True
+        kind, value, offset = self._token()
+        while True:
+            if kind is None:
+                if stack or expect_value:
+                    raise self._error("Unexpected end of JSON", offset)
+                return
+            if expect_value:
+                if '{' == kind:
+                    stack.append('{')
+                    yield 'start_map', None, offset
+                    kind, value, offset = self._token()
+                    if '}' != kind:
+                        kind, value, offset = yield from self._key(kind, value, offset)
+                        continue
+                    stack.pop()
+                    yield 'end_map', None, offset
+                    expect_value = False
+                elif '[' == kind:
+                    stack.append('[')
+                    yield 'start_array', None, offset
+                    kind, value, offset = self._token()
+                    if ']' != kind:
+                        continue
+                    stack.pop()
+                    yield 'end_array', None, offset
+                    expect_value = False
+                elif kind in ('string', 'literal', 'number'):
+                    yield 'scalar', value, offset
+                    expect_value = False
+                else:
+                    raise self._error("Expecting value", offset)
+            elif not stack:
+                raise self._error("Extra data", offset)
+            elif ',' == kind:
+                expect_value = True
+                kind, value, offset = self._token()
+                if '{' == stack[-1]:
+                    kind, value, offset = yield from self._key(kind, value, offset)
+                continue
+            elif '}' == kind and '{' == stack[-1]:
+                stack.pop()
+                yield 'end_map', None, offset
+            elif ']' == kind and '[' == stack[-1]:
+                stack.pop()
+                yield 'end_array', None, offset
+            else:
+                raise self._error("Expecting ',' delimiter", offset)
+            kind, value, offset = self._token()
+
+    def _key(self, kind, value, offset):
+        """
+          a key and its ':', leaving the next token, the start of its value
+        """
+        if 'string' != kind:
+            raise self._error("Expecting property name enclosed in double quotes", offset)
+        yield 'key', value, offset
+        kind, _, offset = self._token()
+        if ':' != kind:
+            raise self._error("Expecting ':' delimiter", offset)
+        return self._token()
+
+
+def load_json(source):
+    """
+      (document, LineIndex) of JSON source, as for JsonEvents, or of JsonEvents
+
+      Only (possible) component declarations, and mappings with a $ref, are
+      indexed, as the yaml line loaders do, as are the spans of the entries of
+      the mappings they are declared in
+    """
+    line_index = LineIndex()
+    document = None
+    # [container, key of the value being parsed, line, column, spans (or None), key position] of each open container
+    stack = []
+    events = source if isinstance(source, JsonEvents) else JsonEvents(source)
+    line = column = None
+    for event, value, offset in events:
+        if 'key' == event:
+            parent = stack[-1]
+            parent[1] = value
+            if parent[4] is not None:
+                parent[5] = _position(events, offset)
+            continue
+        if 'start_map' == event:
+            node = {}
+            line, column = events.position(offset)
+        elif 'start_array' == event:
+            node = []
+        elif 'scalar' == event:
+            node = value
+        else:
+            node, _, line, column, spans, _ = stack.pop()
+            if 'end_map' == event and ('$ref' in node or _is_component_depth(stack)):
+                line_index.add(node, line, column)
+            if spans is not None:
+                line_index.add_spans(node, True, spans)
+            if not stack:
+                document = node
+            elif 'end_map' == event and stack[-1][4] is not None:
+                parent = stack[-1]
+                end_line, end_column = _position(events, offset)
+                parent[4][parent[1]] = (parent[5], (line - 1, column - 1), (end_line, end_column + 1), True)
+            continue
+        if stack:
+            parent = stack[-1]
+            if type(parent[0]) is dict:
+                parent[0][parent[1]] = node
+            else:
+                parent[0].append(node)
+        elif 'scalar' == event:
+            document = node
+        if 'scalar' != event:
+            stack.append([node, None, line, column, None, None])
+            if 'start_map' == event and _is_component_depth(stack):
+                # its entries are (possible) component declarations
+                stack[-1][4] = {}
+    return document, line_index
+
+
+def _position(events, offset):
+    """
+      (line, column) of offset, counted from 0, as yaml marks are
+    """
+    line, column = events.position(offset)
+    return line - 1, column - 1
+
+
+def _is_component_depth(ancestors):
+    if 2 == len(ancestors):
+        return ancestors[0][1] in COMPONENT_PARENTS
+    if 3 == len(ancestors):
+        return ancestors[0][1] in COMPONENT_GRANDPARENTS
+    return False
@@ -0,0 +1,127 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['LineIndex', 'COMPONENT_PARENTS', 'COMPONENT_GRANDPARENTS']
+
+from array import array
+from bisect import bisect_left
+
+# top-level keys under which components are declared, swagger and openapi respectively
+COMPONENT_PARENTS = ('parameters', 'responses', 'definitions', 'securityDefinitions')
+COMPONENT_GRANDPARENTS = ('components', )
+
+
+class LineIndex:
+    """
+      Side table of where (line, column) loaded mappings start, keyed on the mapping's identity
+
+      Only the mappings the Analyzer cares about are indexed: (possible) component
+      declarations, and mappings with a $ref.
+      Entries are held in arrays, ordered by id, and found by bisection, so an
+      entry costs a few machine words rather than a dict entry and its int objects.
+      A reference to each indexed mapping is held, so an id can't be recycled
+      whilst it is in the index
+
+      The mappings components are declared in can also have the spans, in the source,
+      of their entries, see add_spans, for splicing edits into it
+    """
+    def __init__(self):
+        self._ids = array('Q')
+        self._lines = array('L')
+        self._columns = array('L')
+        self._nodes = []
+        self._ordered = True
+        self._spans = {}    # id(container) : (container, flow, spans)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return self._slot(node) is not None
+
+    def add(self, node, line, column):
+        node_id = id(node)
+        if self._ordered and len(self._ids) and node_id < self._ids[-1]:
+            self._ordered = False
+        self._ids.append(node_id)
+        self._lines.append(line)
+        self._columns.append(column)
+        self._nodes.append(node)
+
+    def line(self, node, default=None):
+        slot = self._slot(node)
+        return default if slot is None else self._lines[slot]
+
+    def column(self, node, default=None):
+        slot = self._slot(node)
+        return default if slot is None else self._columns[slot]
+
+    def add_spans(self, container, flow, spans):
+        """
+          spans of the container's entries, {key: (key start, value start, value end, value flow)},
+          positions being (line, column), counted from 0, as yaml marks are,
+          and value flow None if the value isn't a mapping
+          flow is whether the container is a flow (or JSON) mapping, rather than a block one
+        """
+        self._spans[id(container)] = (container, flow, spans)
+
+    def spans(self, container):
+        """
+          (flow, spans) of a container, see add_spans, None if they weren't recorded
+        """
+        found = self._spans.get(id(container))
+        if found is None or found[0] is not container:
+            return None
+        return found[1:]
+
+    def __getstate__(self):
+        # ids don't survive pickling, the mappings (pickled along with their document) do
+        return {'nodes': self._nodes, 'lines': self._lines, 'columns': self._columns,
+                'spans': list(self._spans.values())}
+
+    def __setstate__(self, state):
+        self._nodes = state['nodes']
+        self._lines = state['lines']
+        self._columns = state['columns']
+        self._ids = array('Q', (id(node) for node in self._nodes))
+        self._ordered = False
+        self._spans = {id(spans[0]): spans for spans in state.get('spans', ())}
+
+    def order(self):
+        """
+          orders the index now, rather than on the first lookup, so processes forked to
+          share it don't each order their own copy
+        """
+        if not self._ordered:
+            self._order()
+
+    def _slot(self, node):
+        if not self._ordered:
+            self._order()
+        node_id = id(node)
+        slot = bisect_left(self._ids, node_id)
+        if slot < len(self._ids) and self._ids[slot] == node_id:
+            return slot
+        return None
+
+    def _order(self):
+        order = sorted(range(len(self._ids)), key=self._ids.__getitem__)
+        self._ids = array('Q', (self._ids[i] for i in order))
+        self._lines = array('L', (self._lines[i] for i in order))
+        self._columns = array('L', (self._columns[i] for i in order))
+        self._nodes = [self._nodes[i] for i in order]
+        self._ordered = True
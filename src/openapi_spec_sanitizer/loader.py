@@ -15,16 +15,55 @@
 # limitations under the License.
 ########################################################################
 
-__all__ = ['Loader']
+__all__ = ['Loader', 'LoaderBackend', 'MappedFile', 'OpenapiFormat', 'map_file']
 
 import re
 import oyaml as yaml
-import json
+import logging
+import mmap
 import os
-import urllib.request
 from pathlib import Path
 from enum import Enum
-from .exceptions import InvalidFileException
+from .exceptions import InvalidFileException, UnsupportedYamlException
+from .lineindex import LineIndex, COMPONENT_PARENTS, COMPONENT_GRANDPARENTS
+from .scanner import UnscannableException, scan_json, scan_yaml
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+# libyaml bindings are optional: PyYAML only builds them when libyaml is found
+try:
+    _CSafeLoader = yaml.CSafeLoader
+    _CFullLoader = yaml.CFullLoader
+except AttributeError:
+    _CSafeLoader = None
+    _CFullLoader = None
+
+
+class MappedFile(mmap.mmap):
+    """
+      a file, memory mapped read only, read by the parsers as a stream of utf-8 bytes,
+      named, as the file is, for their error messages
+    """
+    def seekable(self):
+        return True
+
+
+def map_file(file):
+    """
+      file, opened 'rb', as a MappedFile, or its bytes, if it's empty, as an empty
+      file can't be mapped, or it can't be mapped
+    """
+    if 0 == os.fstat(file.fileno()).st_size:
+        return file.read()
+    try:
+        buffer = MappedFile(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as exc:
+        logger.debug(f"Loader: reading {file.name}, as unable to map it: {exc}")
+        return file.read()
+    buffer.name = file.name
+    return buffer
 
 
 class OpenapiFormat(Enum):
@@ -33,24 +72,117 @@ class OpenapiFormat(Enum):
     NONE = 3
 
 
+class LoaderBackend(Enum):
+    AUTO = 'auto'
+    C = 'c'
+    PYTHON = 'python'
+
+
 class Loader:
     # Thanks https://stackoverflow.com/questions/13319067/parsing-yaml-return-with-line-number
-    class SafeLineLoader(yaml.loader.SafeLoader):
-        def construct_mapping(self, node, deep=False):
-            mapping = super(Loader.SafeLineLoader, self).construct_mapping(node, deep=deep)
-            mapping['__line__'] = node.start_mark.line + 1
-            return mapping
-
-    class FullLineLoader(yaml.loader.FullLoader):
-        def construct_mapping(self, node, deep=False):
-            mapping = super(Loader.FullLineLoader, self).construct_mapping(node, deep=deep)
-            mapping['__line__'] = node.start_mark.line + 1
-            return mapping
+    # but lines are kept in a LineIndex rather than as a __line__ key in every mapping
+    class LineIndexing:
+        """
+          mixin for the yaml loaders, recording where interesting mappings start
+        """
+        def construct_document(self, node):
+            self.line_index = LineIndex()
+            self._container_nodes = self._container_nodes_of(node)
+            self._indexed_nodes = {id(component) for container in self._container_nodes.values()
+                                   for _, component in container.value}
+            try:
+                return super().construct_document(node)
+            finally:
+                del self._indexed_nodes
+                del self._container_nodes
+
+        @staticmethod
+        def _container_nodes_of(root):
+            """
+              {id: node} of the mapping nodes components might be declared in
+            """
+            def children(node):
+                if isinstance(node, yaml.MappingNode):
+                    return node.value
+                return ()
+
+            containers = []
+            for key_node, value_node in children(root):
+                if key_node.value in COMPONENT_PARENTS:
+                    containers.append(value_node)
+                elif key_node.value in COMPONENT_GRANDPARENTS:
+                    containers += [group for _, group in children(value_node)]
+            return {id(container): container for container in containers if isinstance(container, yaml.MappingNode)}
+
+        def _spans(self, node):
+            """
+              spans of a container node's entries, see LineIndex.add_spans, None if merged
+              or aliased entries mean they aren't where they're used
+            """
+            def position(mark):
+                return mark.line, mark.column
+
+            spans = {}
+            for key_node, value_node in node.value:
+                if (not isinstance(key_node, yaml.ScalarNode) or MERGE_TAG == key_node.tag or
+                        value_node.start_mark.index < key_node.end_mark.index):
+                    return None
+                flow = value_node.flow_style if isinstance(value_node, yaml.MappingNode) else None
+                spans[self.construct_object(key_node)] = (position(key_node.start_mark), position(value_node.start_mark),
+                                                          position(value_node.end_mark), flow)
+            return spans
+
+        def construct_yaml_map(self, node):
+            data = {}
+            yield data
+            # before any merge keys are flattened
+            spans = self._spans(node) if id(node) in self._container_nodes else None
+            data.update(self.construct_mapping(node))
+            if id(node) in self._indexed_nodes or '$ref' in data:
+                self.line_index.add(data, node.start_mark.line + 1, node.start_mark.column + 1)
+            if spans is not None:
+                self.line_index.add_spans(data, bool(node.flow_style), spans)
+
+    class SafeLineLoader(LineIndexing, yaml.loader.SafeLoader):
+        pass
+
+    class FullLineLoader(LineIndexing, yaml.loader.FullLoader):
+        pass
+
+    line_loaders = [SafeLineLoader, FullLineLoader]
+
+    if _CSafeLoader is not None:
+        # libyaml does the scanning, parsing and composing, the (python) constructor
+        # still gets the composed nodes, and so their marks
+        class CSafeLineLoader(LineIndexing, _CSafeLoader):
+            pass
+
+        class CFullLineLoader(LineIndexing, _CFullLoader):
+            pass
+
+        line_loaders += [CSafeLineLoader, CFullLineLoader]
+
+    for line_loader in line_loaders:
+        line_loader.add_constructor('tag:yaml.org,2002:map', LineIndexing.construct_yaml_map)
+    del line_loader
 
     def __init__(self, args):
         self.sanitize = args.sanitize
         self.filename = None
+        self.source = None
         self.document = None
+        self.line_index = None
+        # the file loaded, mapped, if splicing, for the Dumper to splice, see Dumper.splice
+        self.keep_buffer = self.sanitize and getattr(args, 'splice', False)
+        self.buffer = None
+        self.cache = None
+        self.parse_cache = None
+        if args.cachedir is not None:
+            # json, and urllib, are only imported for JSON, and urls, when they are needed
+            from .cache import UrlCache, ParseCache
+            self.cache = UrlCache(args.cachedir, ttl=args.cache_ttl, max_size=args.cache_size * 1024 * 1024)
+            if args.parse_cache:
+                self.parse_cache = ParseCache(args.cachedir, max_size=args.cache_size * 1024 * 1024)
         self.default_openapi_format = OpenapiFormat.NONE
         if args.yaml:
             self.default_openapi_format = OpenapiFormat.YAML
@@ -58,21 +190,157 @@ class Loader:
             self.default_openapi_format = OpenapiFormat.JSON
         # might regret loader driving this....
         self.openapi_format = OpenapiFormat.NONE
-        self.loader = self.FullLineLoader if self.sanitize else self.SafeLineLoader
+        self.backend = self._select_backend(LoaderBackend(args.loader_backend))
+        if LoaderBackend.C == self.backend:
+            self.safe_loader = self.CSafeLineLoader
+            self.loader = self.CFullLineLoader if self.sanitize else self.CSafeLineLoader
+        else:
+            self.safe_loader = self.SafeLineLoader
+            self.loader = self.FullLineLoader if self.sanitize else self.SafeLineLoader
+        # a report doesn't need the whole document, just its components and $refs
+        self.scanning = args.scan and not self.sanitize
+        # reports have line numbers, and splicing the spans of what's removed, which a sanitized
+        # document doesn't need, so is loaded by the json module, several times faster
+        json_backend = args.json_backend
+        if json_backend is None:
+            json_backend = 'stream' if not self.sanitize or self.keep_buffer else 'stdlib'
+        self.json_stream = 'stream' == json_backend
+        logger.debug(f"Loader: using {self.backend.value} backend, {self.loader.__name__}")
 
-    def load_url(self, url):
-        with urllib.request.urlopen(url) as file:
+    @staticmethod
+    def _select_backend(backend):
+        """
+          auto prefers libyaml, falling back to pure python
+        """
+        c_available = _CSafeLoader is not None
+        if LoaderBackend.AUTO == backend:
+            return LoaderBackend.C if c_available else LoaderBackend.PYTHON
+        if LoaderBackend.C == backend and not c_available:
+            raise UnsupportedYamlException("loader backend 'c' requested but PyYAML was built without libyaml")
+        return backend
+
+    def _load_yaml(self, stream, loader):
+        """
+          as yaml.load, but keeps hold of the loader's LineIndex
+        """
+        yaml_loader = loader(stream)
+        try:
+            self.document = yaml_loader.get_single_data()
+        finally:
+            yaml_loader.dispose()
+        self.line_index = getattr(yaml_loader, 'line_index', None)
+        return self.document
+
+    def _parse(self, source, loader):
+        """
+          source is a stream, or the content itself
+        """
+        if self._is_scanning():
+            return self._scan(source, loader)
+        return self._load(source, loader)
+
+    def _is_scanning(self):
+        """
+          JSON is only scanned with the stream backend, the json module has no events
+        """
+        return self.scanning and (OpenapiFormat.YAML == self.openapi_format or self.json_stream)
+
+    def _scan(self, source, loader):
+        """
+          as _parse, but only as much of the document as the Analyzer needs, see scanner,
+          falling back to loading it if it can't be scanned
+        """
+        if hasattr(source, 'read') and not (hasattr(source, 'seekable') and source.seekable()):
+            source = source.read()
+        try:
             if OpenapiFormat.YAML == self.openapi_format:
-                self.document = yaml.load(file, Loader=self.SafeLineLoader)
-            elif OpenapiFormat.JSON == self.openapi_format:
-                file_contents = file.read()
+                self.document, self.line_index = scan_yaml(source, loader)
+            else:
+                self.document, self.line_index = scan_json(source)
+        except UnscannableException as exc:
+            logger.debug(f"Loader: loading, as unable to scan: {exc}")
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            self._load(source, loader)
+        return self.document
+
+    def _load(self, source, loader):
+        """
+          the whole document
+        """
+        if OpenapiFormat.YAML == self.openapi_format:
+            self._load_yaml(source, loader)
+        elif OpenapiFormat.JSON == self.openapi_format:
+            if self.json_stream:
+                from .jsonstream import load_json
+                self.document, self.line_index = load_json(source)
+            else:
+                import json
+                if isinstance(source, mmap.mmap):
+                    # decoded straight from the mapping
+                    file_contents = str(source, 'utf-8')
+                elif hasattr(source, 'read'):
+                    # decoded as read, so the bytes are let go of before parsing
+                    file_contents = source.read()
+                    if isinstance(file_contents, bytes):
+                        file_contents = file_contents.decode('utf-8')
+                else:
+                    file_contents = source
                 self.document = json.loads(file_contents)
+                self.line_index = None
         return self.document
 
+    def _parse_cached(self, content, loader):
+        """
+          as _parse, for content as bytes, or a MappedFile, skipping the parsing if it's in the parse cache
+        """
+        if self.parse_cache is None:
+            return self._parse(content, loader)
+        if OpenapiFormat.YAML == self.openapi_format:
+            mode = 'Full' if issubclass(loader, yaml.constructor.FullConstructor) else 'Safe'
+        else:
+            mode = self.openapi_format.name if self.json_stream else 'JSON-stdlib'
+        if self._is_scanning():
+            mode += '-scan'
+        key = self.parse_cache.key(content, mode)
+        cached = self.parse_cache.get(key)
+        if cached is not None:
+            logger.debug(f"Loader: parse cache hit {key}")
+            self.document, self.line_index = cached
+            return self.document
+        self._parse(content, loader)
+        self.parse_cache.put(key, self.document, self.line_index)
+        return self.document
+
+    def load_url(self, url):
+        self.source = url
+        if self.cache is not None:
+            return self._parse_cached(self.cache.fetch(url), self.safe_loader)
+        import urllib.request
+        with urllib.request.urlopen(url) as file:
+            return self._parse(file, self.safe_loader)
+
     def load_str(self, yaml_str):
-        self.document = yaml.load(yaml_str, Loader=self.loader)
+        self.source = None
+        if self.scanning:
+            try:
+                self.document, self.line_index = scan_yaml(yaml_str, self.loader)
+                return self.document
+            except UnscannableException as exc:
+                logger.debug(f"Loader: loading, as unable to scan: {exc}")
+        self._load_yaml(yaml_str, self.loader)
         return self.document
 
+    def load_text(self, text, openapi_format):
+        """
+          a spec itself, never a file path or url, as load can take it to be
+        """
+        self.release()
+        self.source = None
+        self.filename = None
+        self.openapi_format = openapi_format
+        return self._parse(text, self.loader)
+
     def _yaml_format(self, name, openapi_fmt=None):
         if name is None:
             if openapi_fmt is not OpenapiFormat.NONE:
@@ -90,17 +358,33 @@ class Loader:
         return self.openapi_format
 
     def load_path(self, file_path):
-
-        with open(file_path, 'r', encoding='utf-8') as file:
-            if OpenapiFormat.YAML == self.openapi_format:
-                self.document = yaml.load(file, Loader=self.loader)
-            elif OpenapiFormat.JSON == self.openapi_format:
-                file_contents = file.read()
-                self.document = json.loads(file_contents)
+        """
+          the file as utf-8 bytes, for the parsers to decode themselves, a chunk at a time,
+          but memory mapped, see MappedFile, if splicing, for the Dumper to splice too
+        """
+        self.source = file_path
+        self.release()
+        with open(file_path, 'rb') as file:
+            source = file
+            if self.keep_buffer:
+                source = self.buffer = map_file(file)
+            if self.parse_cache is not None:
+                self._parse_cached(file.read() if source is file else source, self.loader)
+            else:
+                self._parse(source, self.loader)
         self.filename = file_path
         return self.document
 
+    def release(self):
+        """
+          unmaps the file last loaded, if it was kept for splicing
+        """
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = None
+
     def load(self, file):
+        self.release()
         # TODO make this a factory
         if (Path(file).exists() and Path(file).is_file()):
             self._yaml_format(file)
@@ -127,3 +411,9 @@ class Loader:
           not all routes yield a filename
         """
         return self.filename
+
+    def get_source(self):
+        """
+          file path, or url, loaded from, None for a string
+        """
+        return self.source
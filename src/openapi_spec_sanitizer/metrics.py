@@ -0,0 +1,105 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Metrics', 'Phase']
+
+import time
+from contextlib import contextmanager
+
+
+class Phase:
+    """
+      wall, and cpu, seconds of a phase, and the peak of the memory traced by
+      tracemalloc during it, in bytes, None unless tracemalloc is tracing
+    """
+    __slots__ = ('name', 'wall', 'cpu', 'peak')
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = None
+
+    def as_dict(self):
+        return {'wall': self.wall, 'cpu': self.cpu, 'peak': self.peak}
+
+
+class Metrics:
+    """
+      Where the time, and memory, of sanitizing a spec went, a Phase for each of
+        load      Loader.load, parsing, or scanning, the spec
+        analyze   walking the spec, and the documents it refers to, for the component graph
+        capture   working out which components are unused, or undefined
+        sanitize  tagging, or removing, the unused components
+        dump      writing the sanitized spec
+      in the order they ran, and counts of the component graph
+
+      Timing is always on, being cheap. Memory is only measured if asked for, and
+      tracemalloc is tracing, see --profile, as tracing slows everything down, and
+      each phase resets the peak traced, which would upset any other measurement.
+      Before python 3.9 the peak can't be reset, so a phase's is the peak so far
+    """
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases = {}    # name : Phase
+        self.counts = {}
+
+    def reset(self):
+        self.phases = {}
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+          times the body as the phase name, adding to it if it has run before
+        """
+        tracing = False
+        if self.memory:
+            import tracemalloc
+            tracing = tracemalloc.is_tracing()
+        if tracing and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            phase = self.phases.get(name)
+            if phase is None:
+                phase = self.phases[name] = Phase(name)
+            phase.wall += time.perf_counter() - wall
+            phase.cpu += time.process_time() - cpu
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                phase.peak = peak if phase.peak is None else max(phase.peak, peak)
+
+    def as_dict(self):
+        return {'phases': {name: phase.as_dict() for name, phase in self.phases.items()},
+                'counts': dict(self.counts)}
+
+    def report(self):
+        lines = ["------------------------ Profile ----------------",
+                 f"  {'phase':10} {'wall s':>9} {'cpu s':>9} {'peak MB':>9}"]
+        for name, phase in self.phases.items():
+            peak = f"{phase.peak / 1e6:9.1f}" if phase.peak is not None else f"{'-':>9}"
+            lines.append(f"  {name:10} {phase.wall:9.3f} {phase.cpu:9.3f} {peak}")
+        wall = sum(phase.wall for phase in self.phases.values())
+        cpu = sum(phase.cpu for phase in self.phases.values())
+        lines.append(f"  {'total':10} {wall:9.3f} {cpu:9.3f}")
+        if self.counts:
+            lines.append("  " + ', '.join(f"{name} {count}" for name, count in self.counts.items()))
+        lines.append("----------------------- ~Profile ----------------\n")
+        return '\n'.join(lines)
@@ -0,0 +1,185 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['ReportFormat', 'report_fragment', 'write_report']
+
+import io
+from enum import Enum
+
+from . import __version__
+
+# json.encoder.encode_basestring, only imported once a json, or sarif, report is made, see _import_json
+_string = None
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+INFORMATION_URI = 'https://github.com/DavidTurland/openapi-spec-sanitizer'
+RULES = (('unused-component', "Component declared, but never referred to, other than by unused components"),
+         ('undefined-component', "Component referred to, but never declared"))
+
+
+class ReportFormat(Enum):
+    TEXT = 'text'
+    JSON = 'json'
+    SARIF = 'sarif'
+
+
+def _int(value):
+    return 'null' if value is None else str(int(value))
+
+
+def report_fragment(report_format, analyzer, filename, status, message=''):
+    """
+      one spec's findings, as a piece of the whole report, see write_report,
+      written straight from the Analyzer's entries
+      status is 'clean', 'dirty' or 'error'
+    """
+    if ReportFormat.TEXT == report_format:
+        return analyzer.report()
+    _import_json()
+    file = io.StringIO()
+    if ReportFormat.JSON == report_format:
+        _json_fragment(file, analyzer, filename, status, message)
+    else:
+        _sarif_fragment(file, analyzer, filename, status, message)
+    return file.getvalue()
+
+
+def write_report(report_format, results, file):
+    """
+      the whole report, from the fragments of BatchResults, to a text stream, on a single line
+      a BatchResult without a fragment is reported as its status, and message, alone
+    """
+    _import_json()
+    write = file.write
+    if ReportFormat.JSON == report_format:
+        write('{"files":[')
+        _join(write, (result.report or _bare_fragment(report_format, result) for result in results))
+        write(']}\n')
+        return
+    # a sarif fragment is a list of results, then one of notifications, each a list of items
+    write(f'{{"$schema":{_string(SARIF_SCHEMA)},"version":"2.1.0","runs":[{{"tool":{{"driver":{{')
+    write(f'"name":"openapi_spec_sanitizer","version":{_string(__version__)},')
+    write(f'"informationUri":{_string(INFORMATION_URI)},"rules":[')
+    _join(write, (f'{{"id":{_string(rule)},"shortDescription":{{"text":{_string(text)}}}}}' for rule, text in RULES))
+    write(']}},"results":[')
+    fragments = [(result.report or _bare_fragment(report_format, result)).split('\n') for result in results]
+    _join(write, (fragment[0] for fragment in fragments if fragment[0]))
+    notifications = [fragment[1] for fragment in fragments if fragment[1]]
+    successful = 'false' if notifications else 'true'
+    write(f'],"invocations":[{{"executionSuccessful":{successful},"toolExecutionNotifications":[')
+    _join(write, notifications)
+    write(']}]}]}\n')
+
+
+def _bare_fragment(report_format, result):
+    """
+      of a BatchResult with no findings to report, e.g. of a spec that didn't load
+    """
+    status = result.NAMES[result.status]
+    if ReportFormat.JSON == report_format:
+        return (f'{{"file":{_string(result.filename)},"status":{_string(status)},'
+                f'"message":{_string(result.message)},"unused":[],"undefined":[]}}')
+    if 'error' != status:
+        return '\n'
+    return f'\n{{"level":"error","message":{{"text":{_string(f"{result.filename}: {result.message}")}}}}}'
+
+
+def _import_json():
+    global _string
+    if _string is None:
+        from json.encoder import encode_basestring as _string
+
+
+def _join(write, items):
+    separator = ''
+    for item in items:
+        write(separator)
+        write(item)
+        separator = ','
+
+
+def _json_fragment(file, analyzer, filename, status, message):
+    write = file.write
+    write(f'{{"file":{_string(filename)},"status":{_string(status)},"message":{_string(message)},"unused":[')
+    separator = ''
+    for path, entry in (analyzer.unused_components or {}).items():
+        write(f'{separator}{{"path":{_string(path)},"line":{_int(entry.line)}')
+        if entry.generation is not None:
+            write(f',"generation":{_int(entry.generation)}')
+        write(',"referrers":[')
+        _json_referrers(write, entry.referrers)
+        write(']}')
+        separator = ','
+    write('],"undefined":[')
+    separator = ''
+    for path, undefined in (analyzer.undefined_components or {}).items():
+        write(f'{separator}{{"path":{_string(path)},"referrers":[')
+        _json_referrers(write, undefined.referrers)
+        write(']}')
+        separator = ','
+    write(']')
+    if analyzer.changes is not None:
+        for name in ('now_unused', 'now_used'):
+            write(f',"{name}":[')
+            _join(write, (_string(path) for path in sorted(analyzer.changes[name])))
+            write(']')
+    write('}')
+
+
+def _json_referrers(write, referrers):
+    separator = ''
+    for referrer in referrers.values():
+        write(f'{separator}{{"path":{_string(referrer.node_path)},"line":{_int(referrer.line)}}}')
+        separator = ','
+
+
+def _sarif_fragment(file, analyzer, filename, status, message):
+    """
+      the results, a line, then the notifications, a line, each a comma separated list
+    """
+    def location(path, line):
+        """
+          paths in other documents are '<resolver key>#<json pointer>'
+        """
+        document, sharp, pointer = path.rpartition('#')
+        uri = filename
+        if sharp:
+            uri = analyzer.resolver.location(document) if analyzer.resolver is not None else document
+        region = f',"region":{{"startLine":{_int(line)}}}' if line else ''
+        return (f'"locations":[{{"physicalLocation":{{"artifactLocation":{{"uri":{_string(uri)}}}{region}}},'
+                f'"logicalLocations":[{{"fullyQualifiedName":{_string(pointer)}}}]}}]')
+
+    write = file.write
+    separator = ''
+    for path, entry in (analyzer.unused_components or {}).items():
+        text = _string(f"{path} is declared, but never referred to")
+        write(f'{separator}{{"ruleId":"unused-component","ruleIndex":0,"level":"warning","message":{{"text":{text}}},')
+        write(location(path, entry.line))
+        write('}')
+        separator = ','
+    for path, undefined in (analyzer.undefined_components or {}).items():
+        text = _string(f"{path} is referred to, but never declared")
+        for referrer in undefined.referrers.values():
+            write(f'{separator}{{"ruleId":"undefined-component","ruleIndex":1,"level":"error",'
+                  f'"message":{{"text":{text}}},')
+            write(location(referrer.node_path, referrer.line))
+            write('}')
+            separator = ','
+    write('\n')
+    # undefined components are errors, but they are reported as results
+    if 'error' == status and not analyzer.undefined_components:
+        write(f'{{"level":"error","message":{{"text":{_string(f"{filename}: {message}")}}}}}')
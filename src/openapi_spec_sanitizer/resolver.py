@@ -0,0 +1,109 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Resolver']
+
+import argparse
+import logging
+import os
+import re
+
+from .loader import Loader
+from .exceptions import InvalidFileException, Unrecoverable
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+URL_REGEX = re.compile(r'^(?:http|ftp)s?://', re.IGNORECASE)
+
+
+class Resolver:
+    """
+      Finds, and loads, the documents that $refs in other documents refer to
+
+      Documents are known by a key: urls as is, files by their path relative to
+      the root document's directory, so keys read well in reports.
+      Each document is loaded once, however many documents refer to it, and
+      a batch of newly referred to documents are loaded concurrently.
+      They are loaded whole, never scanned, as a $ref can be to anywhere in one
+    """
+    def __init__(self, args, root, workers=8):
+        """
+           root  the url, or file path, the root document was loaded from
+        """
+        self.args = argparse.Namespace(**{**vars(args), 'scan': False})
+        self.workers = workers
+        self.root_is_url = URL_REGEX.match(root) is not None
+        self.root_dir = None if self.root_is_url else os.path.dirname(os.path.abspath(root))
+        self.root_key = self._key(self._location(None, root))
+        self.documents = {}    # key : (document, line_index)
+
+    def _location(self, base_key, uri):
+        """
+          absolute url, or file path, of uri, relative to the document base_key
+        """
+        if URL_REGEX.match(uri):
+            return uri
+        base = self.location(base_key) if base_key is not None else None
+        if base is not None and URL_REGEX.match(base):
+            import urllib.parse
+            return urllib.parse.urljoin(base, uri)
+        base_dir = os.path.dirname(base) if base is not None else os.getcwd()
+        return os.path.normpath(os.path.join(base_dir, uri))
+
+    def _key(self, location):
+        if URL_REGEX.match(location) or self.root_dir is None:
+            return location
+        return os.path.relpath(location, self.root_dir).replace(os.sep, '/')
+
+    def location(self, key):
+        if URL_REGEX.match(key) or self.root_dir is None:
+            return key
+        return os.path.normpath(os.path.join(self.root_dir, key))
+
+    def resolve(self, base_key, uri):
+        """
+          key of the document uri refers to, from the document base_key, None for the root
+        """
+        if base_key is None:
+            base_key = self.root_key
+        return self._key(self._location(base_key, uri))
+
+    def _load(self, key):
+        # Loaders are stateful, so one each
+        loader = Loader(self.args)
+        document = loader.load(self.location(key))
+        return document, loader.line_index
+
+    def load(self, keys):
+        """
+          {key: (document, line_index)} for those of keys not already loaded
+        """
+        keys = sorted(set(keys) - set(self.documents) - {self.root_key})
+        if not keys:
+            return {}
+        logger.debug(f"Resolver: loading {', '.join(keys)}")
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as executor:
+            futures = {key: executor.submit(self._load, key) for key in keys}
+        loaded = {}
+        for key, future in futures.items():
+            try:
+                loaded[key] = future.result()
+            except (Unrecoverable, OSError, ValueError) as e:
+                raise InvalidFileException(f"unable to load referenced document {key}: {e}") from e
+        self.documents.update(loaded)
+        return loaded
@@ -18,12 +18,18 @@ __all__ = ['Sanitizer']
 
 from enum import Enum
 import logging
+import os
 
 from .loader import Loader
 from .stateful import Stateful
 from .analyzer import Analyzer, State
+from .baseline import Baseline
 from .exceptions import Unrecoverable, Warning
 from .dumper import Dumper
+from .resolver import Resolver
+from .splicer import Splicer, UnspliceableException
+from .report import ReportFormat
+from .metrics import Metrics
 
 logger = logging.getLogger('openapi_spec_sanitizer')
 
@@ -37,35 +43,88 @@ class Sanitizer(Stateful):
 
     def __init__(self, args):
         super().__init__(State.UNKNOWN)
+        self.args = args
         self.sanitizing = args.sanitize
         self.output_filename = args.output
         self._debug = args.debug
         self.warnings_are_ok = args.warnings_are_ok
         self.sanitize_mode = self.SanitizeMode.NONE
         self.orig_yaml = {}
+        self.splicing = getattr(args, 'splice', False)
+        self.report_format = ReportFormat(getattr(args, 'report_format', 'text'))
+        self.splicer = None
+        # compared with, and recorded in, if it isn't there yet, or updating it, see Baseline
+        self.baseline_filename = getattr(args, 'baseline', None)
+        self.update_baseline = getattr(args, 'update_baseline', False)
         if self.sanitizing:
-            if args.tag is not None:
+            # tag has a default, so only means tagging if not removing
+            if args.delete:
+                self.sanitize_mode = self.SanitizeMode.DELETE
+            elif args.tag is not None:
                 self.sanitize_mode = self.SanitizeMode.TAG
                 self.sanitize_tag = args.tag
-            elif (args.delete):
-                self.sanitize_mode = self.SanitizeMode.DELETE
+        # where the time went, of the last spec sanitized, see Metrics
+        self.metrics = Metrics(memory=getattr(args, 'profile', False))
         self.loader = Loader(args)
-        self.analyzer = Analyzer(args)
+        self.analyzer = Analyzer(args, self.metrics)
         self.dumper = Dumper(self.loader, args)
 
     def report(self):
         return self.analyzer.report()
 
-    def dump(self, path):
+    def dump(self, path=None):
+        """
+          path defaults to the output filename, see Dumper.dump
+        """
         self.at_least(State.LOADED, "dump")
-        filename = self.output_filename
-        self.dumper.dump(filename)
-        logger.info(f"Main: dumping sanitized yaml to {filename}")
+        with self.metrics.phase('dump'):
+            return self._dump(path)
+
+    def _dump(self, path):
+        if self.splicer is not None:
+            try:
+                filename = self.dumper.splice(self.splicer, path)
+                logger.info(f"Main: spliced {len(self.splicer)} edits into a copy of the spec, {filename}")
+                return filename
+            except UnspliceableException as e:
+                logger.warning(f"Sanitizer: dumping the whole sanitized spec, as unable to splice: {e}")
+        filename = self.dumper.dump(self.orig_yaml, path)
+        logger.info(f"Main: dumped sanitized yaml to {filename}")
+        return filename
+
+    def sanitize(self, file, incremental=False):
+        """
+          incremental reanalyzes only what has changed since file was last sanitized,
+          see Analyzer.reanalyze
+        """
+        # the last spec's findings aren't this one's, whether or not it loads
+        self.analyzer.forget()
+        self.metrics.reset()
+        with self.metrics.phase('load'):
+            self.orig_yaml = self.loader.load(file)
+        self._analyze(incremental)
 
-    def sanitize(self, file):
-        self.orig_yaml = self.loader.load(file)
+    def sanitize_text(self, text, openapi_format):
+        """
+          as sanitize, for the spec itself, see Loader.load_text
+        """
+        self.analyzer.forget()
+        self.metrics.reset()
+        with self.metrics.phase('load'):
+            self.orig_yaml = self.loader.load_text(text, openapi_format)
+        self._analyze()
+
+    def _analyze(self, incremental=False):
+        recording = False
         try:
-            self.analyzer.analyze(self.orig_yaml)
+            recording = self._load_baseline()
+            if incremental:
+                self.analyzer.reanalyze(self.orig_yaml, self.loader.line_index)
+            else:
+                source = self.loader.get_source()
+                # $refs to other documents are relative to where this one came from
+                resolver = Resolver(self.args, source) if source is not None else None
+                self.analyzer.analyze(self.orig_yaml, self.loader.line_index, resolver)
         except Warning as e:
 
             if self.warnings_are_ok:
@@ -76,45 +135,55 @@ class Sanitizer(Stateful):
         except Unrecoverable as e:
             logger.error(f"Sanitizer: Urecoverable issue when analyzing yaml: {e}")
             raise e
+        finally:
+            self.metrics.counts = self.analyzer.counts()
+            if recording and self.analyzer.snapshot is not None:
+                self.analyzer.snapshot.save(self.baseline_filename)
+                logger.info(f"Sanitizer: recorded the baseline {self.baseline_filename}")
         if self.sanitizing:
             logger.info("Sanitizing")
-            root_path = ()
-            self._sanitize(self.orig_yaml, root_path)
+            with self.metrics.phase('sanitize'):
+                self._sanitize()
         self._state = State.SANITIZED
 
-    def _sanitize(self, node, path):
-        if type(node) == list:
-            unused_nodes = []
-            for i, element in enumerate(node):
-                dest_path = path+(i, )
-                dest_path_str = ''.join(['/' + str(n) for n in dest_path])
-                unused_node = dest_path_str in self.analyzer.unused_components
-                if unused_node:
-                    print(f"Marking node {dest_path} as unused")
-                    unused_nodes.append(i)
-                self._sanitize(element, dest_path)
-            for i in sorted(unused_nodes, reverse=True):
-                self._sanitize_node(node[i])
-            # remove bogus __line__
-            node = [kv for kv in node if '__line__' not in kv]
-        elif type(node) == dict:
-            unused_nodes = set()
-            for key, value in node.items():
-                dest_path = path+(key, )
-                dest_path_str = ''.join(['/' + str(n) for n in dest_path])
-                unused_node = dest_path_str in self.analyzer.unused_components
-                if unused_node:
-                    unused_nodes.add(key)
-                    print(f"Marking node {dest_path} as unused")
-                self._sanitize(node[key], dest_path)
-            for key in unused_nodes:
-                self._sanitize_node(node[key])
-            # remove bogus __line__
-            node.pop('__line__', None)
-
-    def _sanitize_node(self, node):
-        """ Assumes node is a dict! """
-        if self.SanitizeMode.TAG == self.sanitize_mode:
-            node[self.sanitize_tag] = True
-        elif self.SanitizeMode.DELETE == self.sanitize_mode:
-            del node
+    def _load_baseline(self):
+        """
+          the Analyzer's baseline, from the baseline file, or an empty one, if there isn't
+          one yet, returning whether the findings are to be recorded in it
+        """
+        if self.baseline_filename is None:
+            return False
+        if os.path.exists(self.baseline_filename):
+            self.analyzer.baseline = Baseline.load(self.baseline_filename)
+            return self.update_baseline
+        logger.info(f"Sanitizer: no baseline {self.baseline_filename} yet, so reporting all the findings")
+        self.analyzer.baseline = Baseline()
+        return True
+
+    def _sanitize(self):
+        """
+          tags, or removes, each unused component where the Analyzer found it, in O(#unused)
+          Components of other documents, referred to, are left be, only this one is dumped
+        """
+        removals = []
+        self.splicer = Splicer(self.loader.line_index, self.loader.get_openapi_format()) if self.splicing else None
+        for path, component in self.analyzer.unused_components.items():
+            if component.container is None or '#' in path:
+                continue
+            generation = f", generation {component.generation}" if component.generation is not None else ''
+            logger.info(f"Sanitizer: marking {path} as unused{generation}")
+            if self.SanitizeMode.TAG == self.sanitize_mode:
+                if self.splicer is not None:
+                    self.splicer.tag(component.container, component.key, self.sanitize_tag)
+                component.container[component.key][self.sanitize_tag] = True
+            elif self.SanitizeMode.DELETE == self.sanitize_mode:
+                removals.append(component)
+        # later list elements first, so earlier indices stay put
+        removals.sort(key=lambda component: component.key if type(component.container) is list else -1, reverse=True)
+        for component in removals:
+            if self.splicer is not None:
+                self.splicer.remove(component.container, component.key)
+            del component.container[component.key]
+        generations = {component.generation for component in removals if component.generation is not None}
+        if generations:
+            logger.info(f"Sanitizer: removed {len(removals)} components, {len(generations)} generations of them")
@@ -0,0 +1,212 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Skeleton', 'UnscannableException', 'scan_json', 'scan_yaml']
+
+import yaml
+
+from .lineindex import LineIndex, COMPONENT_PARENTS, COMPONENT_GRANDPARENTS
+
+# the analyzer needs the version, as well as components and $refs
+VERSION_KEYS = ('swagger', 'openapi')
+STR_TAG = 'tag:yaml.org,2002:str'
+MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+
+class UnscannableException(Exception):
+    """
+      the document uses something (aliases, merge keys, complex keys) a scan can't
+      follow, it has to be loaded
+    """
+    pass
+
+
+class Skeleton:
+    """
+      Builds, from parse events, just as much of a document as the Analyzer looks at:
+      the version, (possible) component declarations, mappings with a $ref, and the
+      containers leading to them. Everything else, examples, descriptions and the like,
+      is dropped as soon as it has been parsed
+      Skipped list elements are kept as None, so indices, and so json pointers, are kept
+      Each open container is a frame: [is mapping, kept container (or None), key of the
+      value being parsed, index of the value being parsed, (line, column)]
+    """
+    NO_KEY = object()
+
+    def __init__(self, construct=None):
+        """
+           construct makes a kept scalar's value from what is passed to scalar
+        """
+        self.construct = construct if construct is not None else (lambda value: value)
+        self.stack = []
+        self.line_index = LineIndex()
+        self.document = None
+
+    def start(self, is_map, position):
+        self.stack.append([is_map, None, self.NO_KEY, 0, position])
+
+    def key(self, key):
+        self.stack[-1][2] = key
+
+    def expecting_key(self):
+        frame = self.stack[-1]
+        return frame[0] and frame[2] is self.NO_KEY
+
+    def scalar(self, value):
+        stack = self.stack
+        if not stack:
+            self.document = self.construct(value)
+            return
+        frame = stack[-1]
+        if frame[0]:
+            key = frame[2]
+            if '$ref' == key or (1 == len(stack) and key in VERSION_KEYS):
+                self._attach(frame, self.construct(value))
+            else:
+                frame[2] = self.NO_KEY
+        else:
+            frame[3] += 1
+
+    def end(self):
+        stack = self.stack
+        is_map, node, _, _, position = stack.pop()
+        candidate = is_map and self._is_candidate()
+        if node is None:
+            if stack and not candidate:
+                frame = stack[-1]
+                if frame[0]:
+                    frame[2] = self.NO_KEY
+                else:
+                    frame[3] += 1
+                return
+            node = {} if is_map else []
+        if is_map and (candidate or '$ref' in node):
+            self.line_index.add(node, position[0], position[1])
+        if stack:
+            self._attach(stack[-1], node)
+        else:
+            self.document = node
+
+    def _is_candidate(self):
+        """
+          the mapping just ended might be a component declaration, as Loader.LineIndexing
+        """
+        stack = self.stack
+        depth = len(stack)
+        if depth < 2 or depth > 3 or not stack[0][0] or not stack[1][0]:
+            return False
+        if 2 == depth:
+            return stack[0][2] in COMPONENT_PARENTS
+        return stack[2][0] and stack[0][2] in COMPONENT_GRANDPARENTS
+
+    def _attach(self, frame, node):
+        if frame[0]:
+            if frame[1] is None:
+                frame[1] = {}
+            frame[1][frame[2]] = node
+            frame[2] = self.NO_KEY
+        else:
+            if frame[1] is None:
+                frame[1] = []
+            kept = frame[1]
+            if len(kept) < frame[3]:
+                kept.extend([None] * (frame[3] - len(kept)))
+            kept.append(node)
+            frame[3] += 1
+
+
+def scan_yaml(stream, loader_class):
+    """
+      (skeleton document, LineIndex) of a yaml stream, or string, parsed by loader_class
+      (a yaml Loader, C or python) which also resolves and constructs the few scalars kept
+    """
+    loader = loader_class(stream)
+    try:
+        return _scan_yaml_events(loader)
+    finally:
+        loader.dispose()
+
+
+def _scan_yaml_events(loader):   # noqa: C901
+    keys = {}   # plain key : constructed key
+
+    def construct(event):
+        tag = event.tag
+        if tag is None or '!' == tag:
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        if STR_TAG == tag:
+            return event.value
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+        return loader.construct_object(node, deep=True)
+
+    def construct_key(event):
+        if event.tag is not None or not event.implicit[0]:
+            return construct(event)
+        key = keys.get(event.value, keys)
+        if key is keys:
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+            if MERGE_TAG == tag:
+                raise UnscannableException(f"merge key at {event.start_mark}")
+            key = keys[event.value] = construct(event)
+        return key
+
+    skeleton = Skeleton(construct)
+    document_mark = None
+    for event in iter(loader.get_event, None):
+        tipe = type(event)
+        if tipe is yaml.ScalarEvent:
+            if skeleton.stack and skeleton.expecting_key():
+                skeleton.key(construct_key(event))
+            else:
+                skeleton.scalar(event)
+        elif tipe is yaml.MappingStartEvent or tipe is yaml.SequenceStartEvent:
+            if skeleton.stack and skeleton.expecting_key():
+                raise UnscannableException(f"complex key at {event.start_mark}")
+            mark = event.start_mark
+            skeleton.start(tipe is yaml.MappingStartEvent, (mark.line + 1, mark.column + 1))
+        elif tipe is yaml.MappingEndEvent or tipe is yaml.SequenceEndEvent:
+            skeleton.end()
+        elif tipe is yaml.AliasEvent:
+            raise UnscannableException(f"alias at {event.start_mark}")
+        elif tipe is yaml.DocumentStartEvent:
+            if document_mark is not None:
+                raise yaml.composer.ComposerError("expected a single document in the stream",
+                                                  document_mark, "but found another document",
+                                                  event.start_mark)
+            document_mark = event.start_mark
+    return skeleton.document, skeleton.line_index
+
+
+def scan_json(source):
+    """
+      (skeleton document, LineIndex) of JSON source, as for JsonEvents
+    """
+    from .jsonstream import JsonEvents
+    skeleton = Skeleton()
+    events = JsonEvents(source)
+    for event, value, offset in events:
+        if 'key' == event:
+            skeleton.key(value)
+        elif 'scalar' == event:
+            skeleton.scalar(value)
+        elif 'start_map' == event:
+            skeleton.start(True, events.position(offset))
+        elif 'start_array' == event:
+            skeleton.start(False, None)
+        else:
+            skeleton.end()
+    return skeleton.document, skeleton.line_index
@@ -0,0 +1,273 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Service', 'ServiceBusy', 'analyze_text']
+
+import argparse
+import collections
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socketserver
+import stat
+import threading
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import oyaml as yaml
+
+from .sanitizer import Sanitizer
+from .loader import OpenapiFormat
+from .batch import BatchResult
+from .exceptions import Warning, Unrecoverable
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+STATUS_NAMES = {BatchResult.CLEAN: 'clean', BatchResult.DIRTY: 'dirty', BatchResult.ERROR: 'error'}
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _sanitizer_args(args, mode):
+    """
+      args for a Sanitizer that reports (mode None), or sanitizes by 'tag', or 'remove'
+    """
+    sanitizer_args = argparse.Namespace(**vars(args))
+    sanitizer_args.sanitize = mode is not None
+    sanitizer_args.delete = 'remove' == mode
+    # the sanitized document is the point, unused components or not
+    sanitizer_args.warnings_are_ok = sanitizer_args.warnings_are_ok or mode is not None
+    return sanitizer_args
+
+
+def analyze_text(sanitizer, text, openapi_format):
+    """
+      the findings of a (reusable) Sanitizer for a spec, as a dict for json,
+      with the sanitized document, as text, if sanitizing
+    """
+    status = BatchResult.CLEAN
+    message = ''
+    sanitized = None
+    try:
+        sanitizer.sanitize_text(text, openapi_format)
+        if sanitizer.sanitizing:
+            sanitized = sanitizer.dumper.dumps(sanitizer.orig_yaml)
+    except Warning as e:
+        status = BatchResult.DIRTY
+        message = str(e)
+    except (Unrecoverable, yaml.YAMLError, ValueError) as e:
+        status = BatchResult.ERROR
+        message = str(e)
+    result = {'status': STATUS_NAMES[status], 'message': message}
+    result.update(sanitizer.analyzer.as_dict())
+    # unused components tolerated (lax, or sanitizing) are still unused
+    if BatchResult.CLEAN == status and result['unused']:
+        result['status'] = STATUS_NAMES[BatchResult.DIRTY]
+    if sanitized is not None:
+        result['sanitized'] = sanitized
+    return result
+
+
+# each worker process has a Sanitizer for each mode, reused for all of the specs it is given
+_worker_args = None
+_worker_sanitizers = {}
+
+
+def _init_worker(args):
+    global _worker_args
+    _worker_args = args
+    _worker_sanitizers.clear()
+
+
+def _ready():
+    pass
+
+
+def _analyze_in_worker(text, openapi_format, mode):
+    sanitizer = _worker_sanitizers.get(mode)
+    if sanitizer is None:
+        sanitizer = _worker_sanitizers[mode] = Sanitizer(_sanitizer_args(_worker_args, mode))
+    return analyze_text(sanitizer, text, openapi_format)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+      POST /analyze   the spec as the body, returns the findings as json
+                      ?format=yaml|json  default from the Content-Type, else yaml
+                      ?sanitize=tag|remove  also return the sanitized spec
+      GET /health     the service's counts
+    """
+    server_version = 'openapi_spec_sanitizer'
+
+    def do_GET(self):
+        if '/health' != urllib.parse.urlsplit(self.path).path:
+            return self._reply(404, {'error': f"no such resource {self.path}"})
+        self._reply(200, self.server.service.stats())
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if '/analyze' != url.path:
+            return self._reply(404, {'error': f"no such resource {self.path}"})
+        query = dict(urllib.parse.parse_qsl(url.query))
+        mode = query.get('sanitize')
+        if mode not in (None, 'tag', 'remove'):
+            return self._reply(400, {'error': f"sanitize must be tag or remove, not {mode}"})
+        openapi_format = query.get('format')
+        if openapi_format is None:
+            openapi_format = 'json' if 'json' in self.headers.get('Content-Type', '') else 'yaml'
+        if openapi_format not in ('yaml', 'json'):
+            return self._reply(400, {'error': f"format must be yaml or json, not {openapi_format}"})
+        length = int(self.headers.get('Content-Length', 0))
+        content = self.rfile.read(length)
+        try:
+            result = self.server.service.analyze(content, OpenapiFormat[openapi_format.upper()], mode)
+        except ServiceBusy as e:
+            return self._reply(503, {'error': str(e)})
+        except UnicodeDecodeError as e:
+            return self._reply(400, {'error': f"spec must be utf-8: {e}"})
+        self._reply(200, result)
+
+    def _reply(self, code, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        # unix sockets have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"Service: {self.address_string()} {format % args}")
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+class Service:
+    """
+      Serves the Sanitizer over a local HTTP, or unix socket, json API, see Handler
+
+      Specs are analyzed by a pool of worker processes, warm and reused, at most
+      queue_size waiting or being analyzed at once, any more are turned away.
+      The results for the last cache_size specs (by content, format and mode) are kept,
+      and returned without analyzing the spec again
+    """
+    def __init__(self, args):
+        self.args = args
+        self.jobs = args.jobs or os.cpu_count() or 1
+        self.cache = collections.OrderedDict()   # key : result, least recently used first
+        self.cache_size = args.service_cache
+        self.lock = threading.Lock()
+        self.queue = threading.BoundedSemaphore(args.queue_size)
+        self.executor = None
+        self.server = None
+        self.counts = collections.Counter()
+
+    @staticmethod
+    def key(content, openapi_format, mode):
+        return hashlib.sha256(f"{openapi_format.name}:{mode}:".encode('utf-8') + content).hexdigest()
+
+    def analyze(self, content, openapi_format, mode=None):
+        """
+          the findings for the spec content (bytes), see analyze_text
+        """
+        key = self.key(content, openapi_format, mode)
+        with self.lock:
+            self.counts['requests'] += 1
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+                self.counts['cache_hits'] += 1
+                return result
+        text = content.decode('utf-8')
+        if not self.queue.acquire(blocking=False):
+            with self.lock:
+                self.counts['turned_away'] += 1
+            raise ServiceBusy(f"{self.args.queue_size} specs already queued, try again later")
+        try:
+            result = self.executor.submit(_analyze_in_worker, text, openapi_format, mode).result()
+        finally:
+            self.queue.release()
+        with self.lock:
+            self.counts['analyzed'] += 1
+            self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {'jobs': self.jobs, 'cached': len(self.cache), **self.counts}
+
+    def start(self):
+        """
+          binds, and starts the workers, without serving, returns the address
+        """
+        # the pool starts its workers as it is given work, from a handler's thread, and forking a process
+        # with threads (and their locks) isn't safe, so they are started by a forkserver, where there is one
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                                              else None)
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=context, initializer=_init_worker,
+                                            initargs=(self.args, ))
+        # starting them now, rather than for the first spec
+        for future in [self.executor.submit(_ready) for _ in range(self.jobs)]:
+            future.result()
+        if self.args.socket is not None:
+            # what's left of a service that wasn't stopped, but nothing else
+            try:
+                if not stat.S_ISSOCK(os.stat(self.args.socket).st_mode):
+                    raise FileExistsError(f"{self.args.socket} exists, and isn't a socket")
+                os.unlink(self.args.socket)
+            except FileNotFoundError:
+                pass
+            self.server = ThreadingUnixHTTPServer(self.args.socket, Handler)
+            address = self.args.socket
+        else:
+            self.server = ThreadingHTTPServer((self.args.host, self.args.port), Handler)
+            address = 'http://{}:{}'.format(*self.server.server_address[:2])
+        self.server.service = self
+        return address
+
+    def serve(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.server_close()
+            if self.args.socket is not None and os.path.exists(self.args.socket):
+                os.unlink(self.args.socket)
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
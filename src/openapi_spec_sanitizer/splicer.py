@@ -0,0 +1,277 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Splicer', 'UnspliceableException']
+
+import re
+from array import array
+
+from .loader import OpenapiFormat
+
+WHITESPACE = b' \t\r\n'
+# a yaml anchor, removing it would leave its aliases dangling
+ANCHOR_REGEX = re.compile(rb'(?<![^\s\[\]{},])&\S')
+# a key that needn't be quoted in yaml
+PLAIN_KEY_REGEX = re.compile(r'[A-Za-z_][\w.-]*')
+# the rest of the line after a {, and the indentation of the next
+FLOW_BREAK_REGEX = re.compile(rb'[ \t]*\r?\n([ \t]*)(?=[^\s}])')
+
+
+class UnspliceableException(Exception):
+    """
+      an edit can't be spliced into the source, it has to be dumped whole
+    """
+    pass
+
+
+class Source:
+    """
+      byte offsets, in a utf-8 buffer, of (line, column) positions, columns in
+      characters, as the parsers count them, lines being found as they are needed
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.lines = array('Q', [0])    # offset of the start of each line found so far
+        first = buffer.find(b'\n')
+        self.newline = b'\r\n' if first > 0 and b'\r' == buffer[first - 1:first] else b'\n'
+
+    def line_start(self, line):
+        lines = self.lines
+        while len(lines) <= line:
+            end = self.buffer.find(b'\n', lines[-1])
+            if end < 0:
+                return len(self.buffer)
+            lines.append(end + 1)
+        return lines[line]
+
+    def line_end(self, offset):
+        """
+          offset of the start of the line after the one offset is in
+        """
+        end = self.buffer.find(b'\n', offset)
+        return len(self.buffer) if end < 0 else end + 1
+
+    def offset(self, position):
+        line, column = position
+        start = self.line_start(line)
+        prefix = self.buffer[start:start + column]
+        if prefix.isascii() and b'\n' not in prefix:
+            return start + column
+        line_bytes = self.buffer[start:self.line_end(start)]
+        return start + len(line_bytes.decode('utf-8')[:column].encode('utf-8'))
+
+    def start_of_line(self, offset):
+        """
+          offset of the start of the line offset is in
+        """
+        return self.buffer.rfind(b'\n', 0, offset) + 1
+
+    def space_before(self, offset):
+        """
+          offset of the start of any whitespace before offset
+        """
+        while offset and self.buffer[offset - 1] in WHITESPACE:
+            offset -= 1
+        return offset
+
+    def space_after(self, offset):
+        """
+          offset of the end of any whitespace from offset
+        """
+        while offset < len(self.buffer) and self.buffer[offset] in WHITESPACE:
+            offset += 1
+        return offset
+
+    def starts_line(self, offset):
+        """
+          is there only indentation before offset on its line
+        """
+        return not self.buffer[self.start_of_line(offset):offset].strip(b' \t')
+
+
+class Splicer:
+    """
+      Edits, tagging or removing component declarations, spliced into the source
+      the document was loaded from, rather than dumping all of the document again.
+      All else, formatting, comments, key order, is left as it was
+
+      Where an edit will go is found from the spans, of the entries of the mappings
+      components are declared in, kept in the loader's LineIndex
+    """
+    def __init__(self, line_index, openapi_format):
+        self.line_index = line_index
+        self.json = OpenapiFormat.JSON == openapi_format
+        self.edits = {}   # id(container) : (container, {key : (tag, was empty), None to remove})
+        self.reason = None
+
+    def __len__(self):
+        return sum(len(edits) for _, edits in self.edits.values())
+
+    def tag(self, container, key, tag):
+        """
+          to be called before the document itself is tagged
+        """
+        value = container[key]
+        if type(value) is not dict:
+            self._unspliceable(f"{key} isn't a mapping, so can't be tagged")
+        elif tag in value:
+            if value[tag] is not True:
+                self._unspliceable(f"{key} is already tagged {tag}, as {value[tag]}")
+        else:
+            self._edit(container, key, (tag, not value))
+
+    def remove(self, container, key):
+        self._edit(container, key, None)
+
+    def _edit(self, container, key, edit):
+        if id(container) not in self.edits:
+            self.edits[id(container)] = (container, {})
+        self.edits[id(container)][1][key] = edit
+
+    def _unspliceable(self, reason):
+        if self.reason is None:
+            self.reason = reason
+
+    def patches(self, buffer):
+        """
+          [(start, end, replacement)] byte offsets, in the source, ordered
+        """
+        if self.reason is not None:
+            raise UnspliceableException(self.reason)
+        if self.edits and self.line_index is None:
+            raise UnspliceableException("the source wasn't loaded with positions")
+        source = Source(buffer)
+        patches = []
+        for container, edits in self.edits.values():
+            found = self.line_index.spans(container)
+            if found is None or any(key not in found[1] for key in edits):
+                raise UnspliceableException(f"where {next(iter(edits))} is declared isn't known")
+            flow, spans = found
+            for key, edit in edits.items():
+                if edit is not None:
+                    patches.append(self._tag(source, spans[key], *edit))
+            removed = [key for key, edit in edits.items() if edit is None]
+            if removed:
+                patches += self._remove(source, flow or self.json, spans, removed, container)
+        patches.sort(key=lambda patch: patch[:2])
+        for previous, patch in zip(patches, patches[1:]):
+            if patch[0] < previous[1]:
+                raise UnspliceableException("edits overlap")
+        return patches
+
+    @staticmethod
+    def splice(buffer, patches, file):
+        """
+          the source, buffer, with patches, see patches, spliced in, to a binary stream,
+          copied straight from the buffer, a span at a time
+        """
+        with memoryview(buffer) as view:
+            position = 0
+            for start, end, replacement in patches:
+                file.write(view[position:start])
+                file.write(replacement)
+                position = end
+            file.write(view[position:])
+
+    def _key(self, tag):
+        if self.json or not PLAIN_KEY_REGEX.fullmatch(tag):
+            import json
+            return json.dumps(tag, ensure_ascii=False)
+        return tag
+
+    def _tag(self, source, span, tag, empty):
+        _, value, _, value_flow = span
+        if value_flow is None:
+            raise UnspliceableException(f"{tag} can only be spliced into a mapping")
+        start = source.offset(value)
+        newline = source.newline.decode('ascii')
+        if value_flow or self.json:
+            if b'{' != source.buffer[start:start + 1]:
+                raise UnspliceableException(f"no {{ where a mapping, to tag {tag}, starts")
+            entry = f"{self._key(tag)}: true"
+            brk = None if empty else FLOW_BREAK_REGEX.match(source.buffer, start + 1)
+            if brk is not None:
+                # as the entries after it are, each on its own line
+                text = f"{newline}{brk.group(1).decode('utf-8')}{entry},"
+            else:
+                text = entry if empty else f"{entry}, "
+            return start + 1, start + 1, text.encode('utf-8')
+        if not source.starts_line(start):
+            raise UnspliceableException(f"a mapping, to tag {tag}, doesn't start its line")
+        text = f"{self._key(tag)}: true{newline}{' ' * value[1]}"
+        return start, start, text.encode('utf-8')
+
+    def _remove(self, source, flow, spans, removed, container):
+        """
+          patches removing runs of entries, for a flow mapping the commas between them too,
+          for a block mapping their lines
+        """
+        if any(key not in spans for key in container):
+            raise UnspliceableException("where all of a mapping's entries are isn't known")
+        removed = set(removed)
+        order = sorted(spans, key=lambda key: spans[key][0])
+        patches = []
+        i = 0
+        while i < len(order):
+            if order[i] not in removed:
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(order) and order[j + 1] in removed:
+                j += 1
+            first, last = spans[order[i]], spans[order[j]]
+            if flow:
+                if j + 1 < len(order):
+                    start, end = source.offset(first[0]), source.offset(spans[order[j + 1]][0])
+                elif i > 0:
+                    start, end = source.offset(spans[order[i - 1]][2]), source.offset(last[2])
+                else:
+                    # and the space around them, {} rather than a blank line
+                    start, end = source.offset(first[0]), source.offset(last[2])
+                    start, end = source.space_before(start), source.space_after(end)
+                replacement = b''
+            else:
+                key_start = source.offset(first[0])
+                if not source.starts_line(key_start):
+                    raise UnspliceableException(f"{order[i]} doesn't start its line")
+                start = source.line_start(first[0][0])
+                end = self._block_end(source, start, source.offset(last[2]))
+                replacement = b''
+                if 0 == i and j + 1 == len(order):
+                    # an empty block mapping is no mapping at all
+                    replacement = b' ' * first[0][1] + b'{}' + source.newline
+            if not self.json and ANCHOR_REGEX.search(source.buffer, start, end):
+                raise UnspliceableException(f"{order[i]} has an anchor, which might be aliased")
+            patches.append((start, end, replacement))
+            i = j + 1
+        return patches
+
+    @staticmethod
+    def _block_end(source, start, end):
+        """
+          the end of the lines of a block mapping entry, from start, to where its value ends,
+          leaving any comments, and blank lines, before the next entry
+        """
+        end = source.start_of_line(end) if source.starts_line(end) else source.line_end(end)
+        buffer = source.buffer
+        while end > start:
+            previous = buffer.rfind(b'\n', 0, end - 1) + 1
+            text = buffer[previous:end].strip()
+            if text and not text.startswith(b'#'):
+                break
+            end = previous
+        return end
@@ -0,0 +1,47 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['InvalidVersion', 'parse_version']
+
+import re
+
+# PEP 440, as packaging.version has it, less epochs, which no spec has: a release,
+# then any pre, post and dev release, and local label, only the release is kept
+VERSION_REGEX = re.compile(r"""
+    v?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?:[-_.]?(?:a|b|c|rc|alpha|beta|pre|preview)[-_.]?[0-9]*)?
+    (?:-[0-9]+|[-_.]?(?:post|rev|r)[-_.]?[0-9]*)?
+    (?:[-_.]?dev[-_.]?[0-9]*)?
+    (?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?
+""", re.VERBOSE | re.IGNORECASE)
+
+
+class InvalidVersion(ValueError):
+    pass
+
+
+def parse_version(version):
+    """
+      the release of a version string, as a tuple of ints, (3, 0, 1) for '3.0.1'
+    """
+    if not isinstance(version, str):
+        raise InvalidVersion(f"Invalid version: {version!r}, not a string")
+    match = VERSION_REGEX.fullmatch(version.strip())
+    if match is None:
+        raise InvalidVersion(f"Invalid version: {version!r}")
+    return tuple(int(part) for part in match.group('release').split('.'))
@@ -0,0 +1,113 @@
+#######################################################################
+# openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+
+__all__ = ['Watcher']
+
+import logging
+import os
+import sys
+import time
+
+from .sanitizer import Sanitizer
+from .analyzer import State
+from .batch import sanitize_one
+from .resolver import URL_REGEX
+from .report import ReportFormat, write_report
+
+logger = logging.getLogger('openapi_spec_sanitizer')
+
+
+class Watcher:
+    """
+      Reports on a spec file each time it, or a local file it refers to, changes
+
+      The Sanitizer, and so the Analyzer's component graph, is kept between reports:
+      when only the spec file itself has changed it is reanalyzed incrementally,
+      see Analyzer.reanalyze
+    """
+    def __init__(self, args, filename):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"can only watch a spec file, not {filename}")
+        self.filename = filename
+        self.interval = args.watch_interval
+        self.sanitizer = Sanitizer(args)
+        self.mtimes = {}
+        self.result = None
+
+    def files(self):
+        """
+          the spec file, and the local files it refers to
+        """
+        files = [self.filename]
+        resolver = self.sanitizer.analyzer.resolver
+        if resolver is not None:
+            files += [resolver.location(key) for key in resolver.documents if not URL_REGEX.match(key)]
+        return files
+
+    @staticmethod
+    def _mtimes(files):
+        mtimes = {}
+        for file in files:
+            try:
+                mtimes[file] = os.stat(file).st_mtime_ns
+            except OSError:
+                mtimes[file] = None
+        return mtimes
+
+    def check(self):
+        """
+          reports again if anything has changed, the BatchResult, None if nothing has
+        """
+        mtimes = self._mtimes(self.files())
+        if mtimes == self.mtimes:
+            return None
+        changed = {file for file in mtimes.keys() | self.mtimes.keys() if mtimes.get(file) != self.mtimes.get(file)}
+        # an analysis that stopped part way might have left the component graph half built
+        incremental = (self.result is not None and State.PARSED == self.sanitizer.analyzer.get_state() and
+                       changed == {self.filename})
+        start = time.perf_counter()
+        # mid edit, most likely, if it doesn't parse, reported as an error by sanitize_one
+        self.result = sanitize_one(self.sanitizer, self.filename, incremental)
+        elapsed = (time.perf_counter() - start) * 1000
+        # what was referred to might have changed
+        self.mtimes = self._mtimes(self.files())
+        if ReportFormat.TEXT == self.sanitizer.report_format:
+            logger.info(self.result.report)
+        else:
+            # a line each check
+            write_report(self.sanitizer.report_format, [self.result], sys.stdout)
+            sys.stdout.flush()
+        logger.info(f"Watch: {self.result} ({'reanalyzed' if incremental else 'analyzed'} in {elapsed:.0f}ms)")
+        return self.result
+
+    def run(self, rounds=None):
+        """
+          checks every interval, until interrupted, or rounds checks,
+          returning the last BatchResult
+        """
+        logger.info(f"Watch: watching {self.filename}, ctrl-c to stop")
+        try:
+            while rounds is None or rounds > 0:
+                self.check()
+                if rounds is not None:
+                    rounds -= 1
+                    if not rounds:
+                        break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        return self.result
@@ -0,0 +1,116 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import json
+import os
+import tempfile
+import unittest
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.baseline import Baseline
+from openapi_spec_sanitizer.batch import BatchResult
+from openapi_spec_sanitizer.exceptions import DirtyYamlWarning, InvalidFileException, InvalidYamlException
+from openapi_spec_sanitizer.report import ReportFormat, report_fragment
+
+SPEC = ("openapi: 3.0.0\n"
+        "paths:\n"
+        "  /wibble:\n"
+        "    get:\n"
+        "      responses:\n"
+        "        '200': {$ref: '#/components/responses/%s'}\n"
+        "components:\n"
+        "  responses:\n"
+        "    a: {description: a}\n"
+        "    b: {description: b}\n")
+
+
+class TestBaseline(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.file = os.path.join(tmpdir.name, 'openapi.yaml')
+        self.baseline = os.path.join(tmpdir.name, 'baseline.json')
+
+    def sanitize(self, spec, *options):
+        with open(self.file, 'w', encoding='utf-8') as f:
+            f.write(spec)
+        sanitizer = Sanitizer(ArgParser().parse_args([self.file, '--baseline', self.baseline] + list(options)))
+        try:
+            sanitizer.sanitize(self.file)
+        except (DirtyYamlWarning, InvalidYamlException) as e:
+            return sanitizer, e
+        return sanitizer, None
+
+    def test_baseline(self):
+        # recorded, if there isn't one, everything being reported
+        sanitizer, e = self.sanitize(SPEC % 'a')
+        self.assertIsInstance(e, DirtyYamlWarning)
+        self.assertListEqual(['/components/responses/b'], list(sanitizer.analyzer.unused_components))
+        with open(self.baseline, encoding='utf-8') as f:
+            self.assertDictEqual({'used': ['/components/responses/a'], 'unused': ['/components/responses/b'],
+                                  'undefined': []},
+                                 {key: value for key, value in json.load(f).items() if key not in ('format', 'version')})
+
+        # the same again is clean
+        sanitizer, e = self.sanitize(SPEC % 'a')
+        self.assertIsNone(e)
+        self.assertDictEqual({}, sanitizer.analyzer.unused_components)
+
+        # only what is new is reported, along with changes of use
+        spec = SPEC % 'b' + "    c: {description: c}\n" + "    d: {$ref: '#/components/responses/missing'}\n"
+        sanitizer, e = self.sanitize(spec)
+        self.assertIsInstance(e, DirtyYamlWarning)
+        analyzer = sanitizer.analyzer
+        self.assertListEqual(['/components/responses/a', '/components/responses/c', '/components/responses/d'],
+                             sorted(analyzer.unused_components))
+        self.assertDictEqual({}, analyzer.undefined_components)
+        self.assertDictEqual({'now_unused': ['/components/responses/a'], 'now_used': ['/components/responses/b']},
+                             analyzer.as_dict()['baseline'])
+        report = json.loads(report_fragment(ReportFormat.JSON, analyzer, self.file, BatchResult.NAMES[BatchResult.DIRTY]))
+        self.assertListEqual(['/components/responses/a'], report['now_unused'])
+        self.assertListEqual(['/components/responses/b'], report['now_used'])
+        self.assertIn("now used: /components/responses/b", analyzer.report())
+
+        # an undefined component, that isn't in the baseline
+        sanitizer, e = self.sanitize(SPEC % 'missing')
+        self.assertIsInstance(e, InvalidYamlException)
+        self.assertListEqual(['/components/responses/missing'], list(sanitizer.analyzer.undefined_components))
+        self.assertListEqual(['/components/responses/a'], list(sanitizer.analyzer.unused_components))
+
+        # the baseline is only recorded again if asked
+        self.sanitize(spec, '--update-baseline')
+        sanitizer, e = self.sanitize(spec)
+        self.assertIsNone(e)
+        baseline = Baseline.load(self.baseline)
+        self.assertSetEqual({'/components/responses/a', '/components/responses/c', '/components/responses/d'},
+                            baseline.unused)
+
+    def test_not_a_baseline(self):
+        for content in ('wibble', '{"format": 0}', '[]'):
+            with open(self.baseline, 'w', encoding='utf-8') as f:
+                f.write(content)
+            with self.assertRaises(InvalidFileException, msg=content):
+                self.sanitize(SPEC % 'a')
+
+    def test_arguments(self):
+        parser = ArgParser()
+        for arguments in (['--update-baseline'], ['--baseline', 'x.json', '-s'], ['--baseline', 'x.json', '-w']):
+            with self.assertRaises(SystemExit, msg=arguments):
+                parser.parse_args(['openapi.yaml'] + arguments)
+
+
+if __name__ == '__main__':
+    unittest.main()
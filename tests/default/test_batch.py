@@ -0,0 +1,102 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+from openapi_spec_sanitizer.__main__ import main
+from openapi_spec_sanitizer.batch import Batch, BatchResult, expand_sources, is_batch
+from openapi_spec_sanitizer.argparser import ArgParser
+
+
+class TestBatch(unittest.TestCase):
+    def test_expand_sources(self):
+        self.assertFalse(is_batch(['./tests/simple.yaml']))
+        self.assertTrue(is_batch(['./tests']))
+        self.assertTrue(is_batch(['./tests/*.json']))
+        self.assertTrue(is_batch(['./tests/simple.yaml', './tests/less_simple.yaml']))
+        self.assertListEqual(expand_sources(['./tests/*.json']), ['./tests/less_simple.json'])
+        in_tests = expand_sources(['./tests'])
+        self.assertIn(os.path.join('./tests', 'openbanking', 'openbanking_specs.yaml'), in_tests)
+        self.assertIn(os.path.join('./tests', 'simple.yaml'), in_tests)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = os.path.join(tmpdir, 'manifest')
+            with open(manifest, 'w', encoding='utf-8') as file:
+                file.write("# specs\n./tests/simple.yaml\n\n./tests/*.json\n./tests/simple.yaml\n")
+            self.assertTrue(is_batch([f"@{manifest}"]))
+            self.assertListEqual(expand_sources([f"@{manifest}"]),
+                                 ['./tests/simple.yaml', './tests/less_simple.json'])
+
+    def test_batch(self):
+        filenames = ['./tests/api-with-examples.yaml',
+                     './tests/simple_unused.yaml',
+                     './tests/less_simple.yaml',
+                     './tests/less_simple.json']
+        expected = [BatchResult.CLEAN, BatchResult.DIRTY, BatchResult.ERROR, BatchResult.ERROR]
+        parser = ArgParser()
+        for jobs in ('1', '2'):
+            args = parser.parse_args(filenames + ['--jobs', jobs])
+            results = Batch(args).run(filenames)
+            self.assertListEqual([result.filename for result in results], filenames)
+            self.assertListEqual([result.status for result in results], expected, jobs)
+            self.assertIn('/components/requestBodies/requestBodyAUnused', results[1].report)
+            self.assertEqual(Batch.exit_code(results), BatchResult.ERROR)
+            self.assertIn('4 files, 1 clean, 1 dirty, 2 with errors', Batch.report(results))
+
+    def test_broken(self):
+        """
+          a spec that doesn't parse is an error, the rest of the batch carrying on
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            broken_yaml = os.path.join(tmpdir, 'broken.yaml')
+            with open(broken_yaml, 'w', encoding='utf-8') as file:
+                file.write("openapi: 3.0.0\npaths: {\n  - [\n")
+            broken_json = os.path.join(tmpdir, 'broken.json')
+            with open(broken_json, 'w', encoding='utf-8') as file:
+                file.write('{"openapi": "3.0.0", "paths": {')
+            filenames = [broken_yaml, './tests/api-with-examples.yaml', broken_json]
+            for options in (['--jobs', '1'], ['--jobs', '2'], ['--jobs', '2', '--json-backend', 'stdlib']):
+                results = Batch(ArgParser().parse_args(filenames + options)).run(filenames)
+                self.assertListEqual([result.status for result in results],
+                                     [BatchResult.ERROR, BatchResult.CLEAN, BatchResult.ERROR], options)
+                self.assertTrue(results[0].message, options)
+                self.assertEqual(Batch.exit_code(results), BatchResult.ERROR)
+
+    def test_broken_single(self):
+        """
+          as a spec of a batch, a spec on its own that doesn't parse, or isn't there, is an error, not dirty
+        """
+        # main sets up the logger, each time
+        logger = logging.getLogger('openapi_spec_sanitizer')
+        self.addCleanup(setattr, logger, 'handlers', list(logger.handlers))
+        self.addCleanup(logger.setLevel, logger.level)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            broken_yaml = os.path.join(tmpdir, 'broken.yaml')
+            with open(broken_yaml, 'w', encoding='utf-8') as file:
+                file.write("openapi: 3.0.0\npaths: {\n  - [\n")
+            broken_json = os.path.join(tmpdir, 'broken.json')
+            with open(broken_json, 'w', encoding='utf-8') as file:
+                file.write('{"openapi": "3.0.0", "paths": {')
+            for filename in (broken_yaml, broken_json, os.path.join(tmpdir, 'missing.yaml')):
+                argv = ['openapi_spec_sanitizer', filename, '-q', '--report-format', 'json']
+                with mock.patch('sys.argv', argv), mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                    self.assertEqual(BatchResult.ERROR, main(), filename)
+                report = json.loads(stdout.getvalue())
+                self.assertEqual('error', report['files'][0]['status'], filename)
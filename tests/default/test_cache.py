@@ -0,0 +1,180 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import http.server
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from pathlib import Path
+from openapi_spec_sanitizer.cache import ParseCache, UrlCache
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.exceptions import DirtyYamlWarning, InvalidYamlException
+from openapi_spec_sanitizer.loader import Loader
+from openapi_spec_sanitizer.argparser import ArgParser
+
+
+class SpecHandler(http.server.BaseHTTPRequestHandler):
+    """
+      a stand-in for a remote spec server, honouring If-None-Match
+    """
+    def do_GET(self):
+        spec = self.server.specs.get(self.path)
+        if spec is None:
+            self.send_error(404)
+            return
+        etag = f'"{hash(spec)}"'
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(spec)))
+        self.end_headers()
+        self.wfile.write(spec)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestUrlCache(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), SpecHandler)
+        self.server.specs = {'/simple_unused.yaml': Path('./tests/simple_unused.yaml').read_bytes()}
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cachedir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cachedir.cleanup()
+
+    def test_ttl_and_revalidation(self):
+        url = f"{self.base_url}/simple_unused.yaml"
+        spec = self.server.specs['/simple_unused.yaml']
+        cache = UrlCache(self.cachedir.name, ttl=3600)
+        self.assertEqual(cache.fetch(url), spec)
+        self.assertEqual(cache.fetch(url), spec)
+        # fresh, so fetched once
+        self.assertEqual(len(self.server.requests), 1)
+
+        cache = UrlCache(self.cachedir.name, ttl=0)
+        self.assertEqual(cache.fetch(url), spec)
+        # stale, so revalidated, and not modified
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNotNone(self.server.requests[-1][1])
+
+        changed = spec.replace(b'wobble', b'wubble')
+        self.server.specs['/simple_unused.yaml'] = changed
+        self.assertEqual(cache.fetch(url), changed)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_eviction(self):
+        for i in range(4):
+            self.server.specs[f'/spec{i}.yaml'] = bytes([i]) * 1000
+        cache = UrlCache(self.cachedir.name, ttl=3600, max_size=2500)
+        for i in range(4):
+            cache.fetch(f"{self.base_url}/spec{i}.yaml")
+        objects = list(Path(self.cachedir.name, 'objects').iterdir())
+        self.assertEqual(len(objects), 2)
+        # the most recently used are kept
+        self.assertEqual(cache.fetch(f"{self.base_url}/spec3.yaml"), bytes([3]) * 1000)
+        self.assertEqual(len(self.server.requests), 4)
+        cache.fetch(f"{self.base_url}/spec0.yaml")
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_concurrent_eviction(self):
+        for i in range(3):
+            self.server.specs[f'/spec{i}.yaml'] = bytes([i]) * 1000
+        cache = UrlCache(self.cachedir.name, ttl=3600, max_size=2500)
+        for i in range(2):
+            cache.fetch(f"{self.base_url}/spec{i}.yaml")
+        read_meta = UrlCache._read_meta
+
+        def evicted(meta_path):
+            # another process evicting the least recently used, once it has been read
+            meta = read_meta(meta_path)
+            if meta is not None and meta['url'].endswith('/spec0.yaml'):
+                meta_path.unlink()
+                Path(self.cachedir.name, 'objects', meta['object']).unlink()
+            return meta
+
+        with mock.patch.object(UrlCache, '_read_meta', side_effect=evicted):
+            self.assertEqual(cache.fetch(f"{self.base_url}/spec2.yaml"), bytes([2]) * 1000)
+        objects = list(Path(self.cachedir.name, 'objects').iterdir())
+        self.assertEqual(len(objects), 1)
+
+    def test_sanitize_url(self):
+        url = f"{self.base_url}/simple_unused.yaml"
+        parser = ArgParser()
+        args = parser.parse_args([url, '--cache', self.cachedir.name])
+        for _ in range(2):
+            sanitizer = Sanitizer(args)
+            with self.assertRaises(DirtyYamlWarning):
+                sanitizer.sanitize(url)
+            self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()),
+                                {'/components/requestBodies/requestBodyAUnused'})
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cachedir.cleanup()
+
+    def test_parse_cache(self):
+        parser = ArgParser()
+        for file in ("./tests/less_simple.yaml", "./tests/less_simple.json"):
+            args = parser.parse_args([file, '--cache', self.cachedir.name, '--parse-cache'])
+            with mock.patch.object(Loader, '_parse', side_effect=Loader._parse, autospec=True) as parse:
+                for _ in range(2):
+                    sanitizer = Sanitizer(args)
+                    with self.assertRaises(InvalidYamlException):
+                        sanitizer.sanitize(file)
+                    self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()),
+                                        {'/components/schemas/schemaA', '/components/parameters/unusedParameter'},
+                                        file)
+                # parsed once, then from the cache
+                self.assertEqual(parse.call_count, 1, file)
+            if file.endswith('.yaml'):
+                self.assertEqual(sanitizer.analyzer.unused_components['/components/schemas/schemaA'].line, 55)
+
+    def test_parse_cache_eviction(self):
+        cache = ParseCache(self.cachedir.name, max_size=2500)
+        keys = [cache.key(bytes([i]), 'YAML') for i in range(4)]
+        for i, key in enumerate(keys):
+            if 2 == i:
+                # used again, so kept
+                self.assertIsNotNone(cache.get(keys[0]))
+            cache.put(key, {'wibble': bytes([i]) * 1000}, None)
+            # put a second apart, rather than within the resolution of mtimes
+            os.utime(Path(self.cachedir.name, 'parsed', f"{key}.pickle"), (i, i))
+        self.assertEqual(2, len(list(Path(self.cachedir.name, 'parsed').iterdir())))
+        self.assertListEqual([({'wibble': bytes([0]) * 1000}, None), None, None, ({'wibble': bytes([3]) * 1000}, None)],
+                             [cache.get(key) for key in keys])
+
+    def test_parse_cache_needs_cachedir(self):
+        with self.assertRaises(SystemExit):
+            with mock.patch('sys.stderr'):
+                ArgParser().parse_args(["./tests/less_simple.yaml", '--parse-cache'])
@@ -0,0 +1,50 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import os
+import tempfile
+import unittest
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.argparser import ArgParser
+from benchmarks.generate import Spec, generate, write
+
+
+class TestGenerate(unittest.TestCase):
+    """
+      the synthetic specs of the benchmarks are only of use if the unused components are those planned
+    """
+    def test_unused(self):
+        specs = [Spec(openapi=3, paths=60, cycles=0.5, unused=0.2, seed=1),
+                 Spec(openapi=2, paths=60, ref_density=3, depth=0, unused=0.3, seed=2),
+                 Spec(openapi=3, paths=20, schemas=50, unused=0)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for n, spec in enumerate(specs):
+                for extension in ('yaml', 'json'):
+                    file = os.path.join(tmpdir, f"openapi{n}.{extension}")
+                    write(generate(spec), file)
+                    sanitizer = Sanitizer(ArgParser().parse_args([file, '-l']))
+                    sanitizer.sanitize(file)
+                    self.assertSetEqual(spec.unused(), set(sanitizer.analyzer.unused_components), file)
+                    self.assertDictEqual({}, sanitizer.analyzer.undefined_components, file)
+        self.assertTrue(all(spec.unused() for spec in specs[:2]))
+
+    def test_too_few_paths(self):
+        with self.assertRaises(ValueError):
+            Spec(paths=10, responses=100, ref_density=1, unused=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import unittest
+from benchmarks.bench_import import MAIN, import_times
+from openapi_spec_sanitizer.version import InvalidVersion, parse_version
+
+
+class TestImports(unittest.TestCase):
+    # only imported once they are needed: for JSON, urls, caching, batches, watching, serving and profiling
+    DEFERRED = ('json', 'urllib.request', 'urllib.error', 'concurrent.futures.process', 'concurrent.futures.thread',
+                'multiprocessing', 'http.server', 'socketserver', 'hashlib', 'pickle', 'tempfile', 'tracemalloc',
+                'packaging', 'openapi_spec_sanitizer.cache', 'openapi_spec_sanitizer.jsonstream',
+                'openapi_spec_sanitizer.service', 'openapi_spec_sanitizer.watch')
+
+    def test_deferred(self):
+        """
+          python -X importtime, of the command line
+        """
+        times = import_times(MAIN)
+        self.assertIn('openapi_spec_sanitizer.sanitizer', times)
+        self.assertListEqual([], [module for module in self.DEFERRED if module in times])
+
+    def test_parse_version(self):
+        for version, release in (('3.0.0', (3, 0, 0)), ('3.1', (3, 1)), ('3.0.0-rc1', (3, 0, 0)),
+                                 ('v3.0.3', (3, 0, 3)), ('3.0.0+local.1', (3, 0, 0)), ('4.0.0', (4, 0, 0))):
+            self.assertEqual(release, parse_version(version), version)
+        for version in ('.3.0.0', 'wibble', '3..0', '3.0.0-', '', 3.0, None):
+            with self.assertRaises(InvalidVersion, msg=version):
+                parse_version(version)
+
+
+if __name__ == '__main__':
+    unittest.main()
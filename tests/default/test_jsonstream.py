@@ -0,0 +1,61 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import io
+import json
+import unittest
+from openapi_spec_sanitizer.jsonstream import JsonEvents, load_json
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_load_json(self):
+        """
+          the same document as json.loads, however the text is chunked
+        """
+        with open("./tests/less_simple.json") as f:
+            text = f.read()
+        expected = json.loads(text)
+        for chunk_size in (1, 7, JsonEvents.CHUNK_SIZE):
+            document, line_index = load_json(JsonEvents(io.StringIO(text), chunk_size=chunk_size))
+            self.assertEqual(document, expected, chunk_size)
+            schema_a = document['components']['schemas']['schemaA']
+            self.assertEqual(line_index.line(schema_a), 85, chunk_size)
+            self.assertEqual(line_index.column(schema_a), 24, chunk_size)
+
+    def test_bytes(self):
+        """
+          utf-8 bytes, characters split between chunks, give the same document, and positions
+        """
+        with open("./tests/less_simple.json") as f:
+            text = f.read().replace('"Unused"', '"Unused ü€😀"')
+        expected = json.loads(text)
+        for chunk_size in (1, 7, JsonEvents.CHUNK_SIZE):
+            document, line_index = load_json(JsonEvents(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+            self.assertEqual(document, expected, chunk_size)
+            schema_a = document['components']['schemas']['schemaA']
+            self.assertEqual(schema_a['description'], "Unused ü€😀", chunk_size)
+            self.assertEqual((line_index.line(schema_a), line_index.column(schema_a)), (85, 24), chunk_size)
+            self.assertEqual(line_index.line(document['components']['schemas']['schemaC']), 106, chunk_size)
+
+    def test_errors(self):
+        for text, position in (('{"a" 1}', (1, 6)), ('[1,\n  x]', (2, 3)), ('{"a": 1}}', (1, 9)), ('"abc', (1, 1))):
+            with self.assertRaises(json.JSONDecodeError) as context:
+                load_json(JsonEvents(io.StringIO(text), chunk_size=2))
+            self.assertEqual((context.exception.lineno, context.exception.colno), position, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import io
+import json
+import unittest
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.batch import Batch, BatchResult
+from openapi_spec_sanitizer.report import ReportFormat, write_report
+
+
+class TestReport(unittest.TestCase):
+    FILES = ["./tests/less_simple.yaml", "./tests/simple_unused.yaml", "./tests/missing.yaml"]
+
+    def report(self, report_format):
+        args = ArgParser().parse_args(self.FILES + ['--jobs', '1', '--report-format', report_format])
+        results = Batch(args).run(self.FILES)
+        file = io.StringIO()
+        write_report(ReportFormat(report_format), results, file)
+        text = file.getvalue()
+        # a line, for a line a report, when watching
+        self.assertEqual(1, text.count('\n'))
+        return json.loads(text)
+
+    def test_json(self):
+        report = self.report('json')
+        less_simple, simple_unused, missing = report['files']
+        self.assertEqual('error', less_simple['status'])
+        self.assertEqual([{'path': '/components/parameters/unusedParameter', 'line': 20, 'referrers': []},
+                          {'path': '/components/schemas/schemaA', 'line': 55, 'referrers': []}],
+                         less_simple['unused'])
+        self.assertEqual([{'path': '/components/responses/undefinedA',
+                           'referrers': [{'path': '/paths//wibble/post/responses/402', 'line': 16}]}],
+                         less_simple['undefined'])
+        self.assertEqual('dirty', simple_unused['status'])
+        self.assertEqual(['/components/requestBodies/requestBodyAUnused'],
+                         [unused['path'] for unused in simple_unused['unused']])
+        # nothing left over from the last file
+        self.assertEqual(('error', [], []), (missing['status'], missing['unused'], missing['undefined']))
+
+    def test_sarif(self):
+        report = self.report('sarif')
+        self.assertEqual('2.1.0', report['version'])
+        run = report['runs'][0]
+        rules = [rule['id'] for rule in run['tool']['driver']['rules']]
+        found = [(rules[result['ruleIndex']], result['level'],
+                  result['locations'][0]['physicalLocation']['artifactLocation']['uri'],
+                  result['locations'][0]['physicalLocation']['region']['startLine'],
+                  result['locations'][0]['logicalLocations'][0]['fullyQualifiedName'])
+                 for result in run['results']]
+        self.assertEqual([('unused-component', 'warning', "./tests/less_simple.yaml", 20,
+                           '/components/parameters/unusedParameter'),
+                          ('unused-component', 'warning', "./tests/less_simple.yaml", 55, '/components/schemas/schemaA'),
+                          ('undefined-component', 'error', "./tests/less_simple.yaml", 16,
+                           '/paths//wibble/post/responses/402'),
+                          ('unused-component', 'warning', "./tests/simple_unused.yaml", 17,
+                           '/components/requestBodies/requestBodyAUnused')],
+                         found)
+        # undefined components are results, a file that can't be loaded isn't
+        invocation = run['invocations'][0]
+        self.assertFalse(invocation['executionSuccessful'])
+        self.assertEqual(1, len(invocation['toolExecutionNotifications']))
+        self.assertIn("./tests/missing.yaml", invocation['toolExecutionNotifications'][0]['message']['text'])
+
+    def test_bare(self):
+        # a result without a fragment, of a spec that didn't load whilst watching
+        results = [BatchResult("./tests/broken.yaml", BatchResult.ERROR, "no yaml")]
+        for report_format in ('json', 'sarif'):
+            file = io.StringIO()
+            write_report(ReportFormat(report_format), results, file)
+            self.assertIn('"./tests/broken.yaml', file.getvalue(), report_format)
+            report = json.loads(file.getvalue())
+            if 'json' == report_format:
+                self.assertEqual([{'file': "./tests/broken.yaml", 'status': 'error', 'message': "no yaml",
+                                   'unused': [], 'undefined': []}], report['files'])
+            else:
+                invocation = report['runs'][0]['invocations'][0]
+                self.assertFalse(invocation['executionSuccessful'])
+                self.assertEqual("./tests/broken.yaml: no yaml",
+                                 invocation['toolExecutionNotifications'][0]['message']['text'])
+
+    def test_text(self):
+        args = ArgParser().parse_args(self.FILES[:1] + ['--jobs', '1'])
+        result = Batch(args).run(self.FILES[:1])[0]
+        self.assertEqual(BatchResult.ERROR, result.status)
+        self.assertIn("  path: /components/schemas/schemaA\n", result.report)
+        self.assertIn("  '/components/responses/undefinedA'\n", result.report)
+
+
+if __name__ == '__main__':
+    unittest.main()
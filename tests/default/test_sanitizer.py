@@ -15,10 +15,20 @@
 # limitations under the License.
 ########################################################################
 import oyaml as yaml
+import json
+import os
+import tempfile
+import tracemalloc
 import unittest
+from unittest import mock
 from openapi_spec_sanitizer.sanitizer import Sanitizer
-from openapi_spec_sanitizer.exceptions import InvalidYamlException, UnsupportedYamlException
+from openapi_spec_sanitizer.exceptions import InvalidYamlException, UnsupportedYamlException, DirtyYamlWarning, \
+    InvalidFileException
 from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.analyzer import Analyzer
+from openapi_spec_sanitizer.resolver import Resolver
+from openapi_spec_sanitizer.loader import MappedFile, OpenapiFormat
+from benchmarks.generate import Spec, generate, write
 
 
 class TestSanitizer(unittest.TestCase):
@@ -426,3 +436,493 @@ components:
                             expected_undefined,
                             "expected_undefined"
                             )
+
+    def test_loader_backends(self):
+        file = "./tests/less_simple.yaml"
+        parser = ArgParser()
+        for backend in ('python', 'c', 'auto'):
+            args = parser.parse_args([file, '--loader-backend', backend])
+            try:
+                sanitizer = Sanitizer(args)
+            except UnsupportedYamlException:
+                # no libyaml, so no c backend
+                self.assertEqual(backend, 'c')
+                continue
+            with self.assertRaises(InvalidYamlException):
+                sanitizer.sanitize(file)
+            self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()),
+                                {'/components/schemas/schemaA', '/components/parameters/unusedParameter'},
+                                backend
+                                )
+            self.assertEqual(sanitizer.analyzer.unused_components['/components/schemas/schemaA'].line, 55, backend)
+            self.assertNotIn('__line__', sanitizer.orig_yaml['components']['schemas']['schemaA'], backend)
+
+    def test_json_backends(self):
+        file = "./tests/less_simple.json"
+        parser = ArgParser()
+        for backend, line in (('stream', 85), ('stdlib', None)):
+            args = parser.parse_args([file, '--json-backend', backend])
+            sanitizer = Sanitizer(args)
+            with self.assertRaises(InvalidYamlException):
+                sanitizer.sanitize(file)
+            self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()),
+                                {'/components/schemas/schemaA', '/components/parameters/unusedParameter'},
+                                backend
+                                )
+            self.assertEqual(sanitizer.analyzer.unused_components['/components/schemas/schemaA'].line, line, backend)
+        # by default, line numbers when they're reported, or spliced, speed when only sanitizing
+        for options, json_stream in (([], True), (['--no-scan'], True), (['-s'], False), (['-s', '--splice'], True)):
+            self.assertEqual(json_stream, Sanitizer(parser.parse_args([file] + options)).loader.json_stream, options)
+
+    def test_paths_kept_once(self):
+        """
+          each path is kept once, as the key of its entry, a $ref holding the entry it refers to
+        """
+        file = "./tests/less_simple.yaml"
+        sanitizer = Sanitizer(ArgParser().parse_args([file]))
+        with self.assertRaises(InvalidYamlException):
+            sanitizer.sanitize(file)
+        analyzer = sanitizer.analyzer
+        keys = {id(node_path) for node_path in analyzer.components}
+        for entry in analyzer.components.values():
+            self.assertIn(id(entry.node_path), keys)
+            for node_path, referrer in entry.referrers.items():
+                self.assertIs(node_path, referrer.node_path)
+                self.assertIs(entry, referrer.ref)
+        undefined = analyzer.undefined_components['/components/responses/undefinedA']
+        self.assertEqual(['/paths//wibble/post/responses/402'],
+                         [referrer.node_path for referrer in undefined.referrers.values()])
+
+    def test_scan(self):
+        """
+          a report scans the spec, finding the same as loading it all
+        """
+        parser = ArgParser()
+        for file in ("./tests/less_simple.yaml", "./tests/less_simple.json"):
+            found = []
+            schemas = []
+            for options in ([], ['--no-scan']):
+                sanitizer = Sanitizer(parser.parse_args([file] + options))
+                with self.assertRaises(InvalidYamlException):
+                    sanitizer.sanitize(file)
+                found.append(({path: entry.line for path, entry in sanitizer.analyzer.unused_components.items()},
+                              set(sanitizer.analyzer.undefined_components.keys())))
+                schemas.append(sanitizer.orig_yaml['components']['schemas']['schemaA'])
+            self.assertEqual(found[0], found[1], file)
+            # no more than the analyzer needs
+            self.assertNotIn('description', schemas[0], file)
+            self.assertIn('description', schemas[1], file)
+        # aliases can't be scanned, so the spec is loaded
+        spec = ("openapi: 3.0.0\n"
+                "paths:\n"
+                "  /wibble:\n"
+                "    get:\n"
+                "      responses:\n"
+                "        '200': &ok {$ref: '#/components/responses/ok'}\n"
+                "        '201': *ok\n"
+                "components:\n"
+                "  responses:\n"
+                "    ok: {description: ok}\n"
+                "    unused: {description: unused}\n")
+        sanitizer = Sanitizer(parser.parse_args(['--yaml', spec]))
+        with self.assertRaises(DirtyYamlWarning):
+            sanitizer.sanitize(spec)
+        self.assertListEqual(list(sanitizer.analyzer.unused_components.keys()), ['/components/responses/unused'])
+
+    def test_deeply_nested(self):
+        """
+          deeper than the recursion limit, which used to stop the Analyzer
+        """
+        schema = {'$ref': '#/components/schemas/schemaPlain'}
+        for i in range(5000):
+            schema = {'type': 'array', 'items': schema} if i % 2 else {'allOf': [schema]}
+        response = {'content': {'application/json': {'schema': schema}}}
+        document = {'openapi': '3.0.0',
+                    'paths': {'/wibble': {'get': {'responses': {'200': response}}}},
+                    'components': {'schemas': {'schemaPlain': {'type': 'string'},
+                                               'schemaUnused': {'type': 'string'}}}
+                    }
+        args = ArgParser().parse_args(['--yaml', ''])
+        analyzer = Analyzer(args)
+        with self.assertRaises(DirtyYamlWarning):
+            analyzer.analyze(document)
+        self.assertSetEqual(set(analyzer.unused_components.keys()), {'/components/schemas/schemaUnused'})
+
+    def test_cycles(self):
+        test_yaml = """
+openapi: 3.0.0
+paths:
+  /wibble:
+    get:
+      responses:
+        '200':
+          $ref: '#/components/responses/responseUsed'
+components:
+  responses:
+    responseUsed:
+      description: used, and in a cycle with schemaUsedCycle
+      content:
+        application/json:
+          schema:
+            $ref: '#/components/schemas/schemaUsedCycle'
+  schemas:
+    schemaUsedCycle:
+      type: object
+      properties:
+        next:
+          $ref: '#/components/schemas/schemaUsedCycle'
+    schemaUnusedCycleA:
+      type: object
+      properties:
+        b:
+          $ref: '#/components/schemas/schemaUnusedCycleB'
+    schemaUnusedCycleB:
+      type: object
+      properties:
+        a:
+          $ref: '#/components/schemas/schemaUnusedCycleA'
+        used:
+          $ref: '#/components/schemas/schemaUsedCycle'
+"""
+        parser = ArgParser()
+        args = parser.parse_args(['--yaml', test_yaml])
+        expected_unused = {'/components/schemas/schemaUnusedCycleA',
+                           '/components/schemas/schemaUnusedCycleB'}
+        # results must not depend on earlier analyses in the same process, or sanitizer
+        sanitizer = Sanitizer(args)
+        for _ in range(2):
+            for sanitizer in (sanitizer, Sanitizer(args)):
+                with self.assertRaises(DirtyYamlWarning):
+                    sanitizer.sanitize(test_yaml)
+                self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()), expected_unused)
+                self.assertDictEqual(sanitizer.analyzer.undefined_components, {})
+
+    def test_multi_file(self):
+        file = "./tests/multi/openapi.yaml"
+        parser = ArgParser()
+        args = parser.parse_args([file])
+        sanitizer = Sanitizer(args)
+        with mock.patch.object(Resolver, '_load', side_effect=Resolver._load, autospec=True) as load:
+            with self.assertRaises(InvalidYamlException):
+                sanitizer.sanitize(file)
+        # schemas.yaml is referred to by both other documents, but only loaded once
+        self.assertListEqual(sorted(call[0][1] for call in load.call_args_list),
+                             ['paths/pets.yaml', 'schemas.yaml'])
+        expected_unused = {'/components/responses/UnusedResponse',
+                           'schemas.yaml#/components/schemas/OnlyUsedByUnused',
+                           'schemas.yaml#/components/schemas/Unused'
+                           }
+        self.assertSetEqual(set(sanitizer.analyzer.unused_components.keys()), expected_unused)
+        self.assertSetEqual(set(sanitizer.analyzer.undefined_components.keys()),
+                            {'schemas.yaml#/components/schemas/Missing'})
+        self.assertEqual(sanitizer.analyzer.unused_components['schemas.yaml#/components/schemas/Unused'].line, 18)
+
+    def test_analyze_jobs(self):
+        """
+          the shards walked by worker processes, and merged, make the component graph the one walk does
+        """
+        def graph(analyzer):
+            return [(entry.node_path, entry.tipe, entry.line, entry.ref.node_path if entry.ref is not None else None,
+                     entry.declared, entry.required, entry.component.node_path if entry.component is not None else None,
+                     list(entry.referrers), entry.key)
+                    for entry in analyzer.components.values()]
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        swagger = os.path.join(tmpdir.name, 'swagger.yaml')
+        write(generate(Spec(openapi=2, paths=40, cycles=0.5, unused=0.2, seed=3)), swagger)
+        for file in ("./tests/less_simple.yaml", "./tests/less_simple.json", "./tests/api-with-examples.yaml",
+                     "./tests/multi/openapi.yaml", swagger):
+            found = []
+            for jobs in ('1', '3'):
+                sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-r', '-l', '--analyze-jobs', jobs]))
+                try:
+                    sanitizer.sanitize(file)
+                except InvalidYamlException:
+                    pass
+                analyzer = sanitizer.analyzer
+                found.append((graph(analyzer), {path: entry.line for path, entry in analyzer.unused_components.items()},
+                              list(analyzer.undefined_components), sanitizer.orig_yaml))
+            self.assertEqual(found[0], found[1], file)
+
+    def test_sanitize_modes(self):
+        file = "./tests/simple_unused.yaml"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for options, tagged in ((['-t', 'x-unused'], True), (['-r'], False)):
+                output = os.path.join(tmpdir, f"{options[0]}.yaml")
+                sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-l', '-o', output] + options))
+                sanitizer.sanitize(file)
+                sanitizer.dump()
+                with open(output, encoding='utf-8') as dumped:
+                    request_bodies = yaml.safe_load(dumped)['components']['requestBodies']
+                if tagged:
+                    self.assertIs(request_bodies['requestBodyAUnused']['x-unused'], True)
+                else:
+                    self.assertNotIn('requestBodyAUnused', request_bodies)
+
+    def test_dumper_backends(self):
+        file = "./tests/simple_unused.yaml"
+        dumped = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for backend in ('python', 'c'):
+                output = os.path.join(tmpdir, f"{backend}.yaml")
+                try:
+                    sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-l', '-o', output,
+                                                                  '--dumper-backend', backend]))
+                except UnsupportedYamlException:
+                    # no libyaml, so no c backend
+                    self.assertEqual(backend, 'c')
+                    continue
+                sanitizer.sanitize(file)
+                with open(sanitizer.dump(), encoding='utf-8') as f:
+                    dumped[backend] = f.read()
+            # the same, keys in the same order
+            self.assertEqual(dumped.get('c', dumped['python']), dumped['python'])
+            self.assertLess(dumped['python'].index('paths:'), dumped['python'].index('components:'))
+
+            json_file = os.path.join(tmpdir, 'spec.json')
+            with open(file, encoding='utf-8') as f, open(json_file, 'w', encoding='utf-8') as j:
+                json.dump(yaml.safe_load(f), j)
+            sanitizer = Sanitizer(ArgParser().parse_args([json_file, '-s', '-l', '--compact']))
+            sanitizer.sanitize(json_file)
+            with open(sanitizer.dump(), encoding='utf-8') as f:
+                compact = f.read()
+            self.assertNotIn('\n', compact)
+            self.assertEqual(json.loads(compact), sanitizer.orig_yaml)
+
+    def test_splice(self):
+        spec = """openapi: 3.0.0
+# kept, as is
+paths:
+  /wibble:
+    get:
+      responses:
+        '200':
+          $ref: '#/components/responses/ok'   # this too
+components:
+  schemas:
+    Gone:
+      type: string
+  responses:
+    ok:     {description: ok}
+    # before unused
+    unused:
+      description: ü€
+    alsoUnused: {description: flow}
+"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, 'spec.yaml')
+            with open(file, 'w', encoding='utf-8') as f:
+                f.write(spec)
+            json_file = os.path.join(tmpdir, 'spec.json')
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(yaml.safe_load(spec), f, indent=2, ensure_ascii=False)
+            for source in (file, json_file):
+                for mode in (['-r'], ['-t', 'x-unused']):
+                    output = os.path.join(tmpdir, f"{mode[0]}.san{os.path.splitext(source)[1]}")
+                    sanitizer = Sanitizer(ArgParser().parse_args([source, '-s', '-l', '--splice', '-o', output] + mode))
+                    sanitizer.sanitize(source)
+                    sanitizer.dump()
+                    with open(output, encoding='utf-8') as f:
+                        spliced = f.read()
+                    os.remove(output)
+                    # the same document as dumping it all would give
+                    self.assertEqual(yaml.safe_load(spliced), sanitizer.orig_yaml)
+                    if source == file:
+                        self.assertIn("# kept, as is\n", spliced)
+                        self.assertIn("'#/components/responses/ok'   # this too\n", spliced)
+                        self.assertIn("    ok:     {description: ok}\n", spliced)
+
+            # an anchor might be aliased elsewhere, so the whole spec is dumped
+            with open(file, 'w', encoding='utf-8') as f:
+                f.write(spec.replace('alsoUnused: {', 'alsoUnused: &flow {'))
+            sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-l', '-r', '--splice']))
+            sanitizer.sanitize(file)
+            with self.assertLogs('openapi_spec_sanitizer', level='WARNING') as logs:
+                output = sanitizer.dump()
+            self.assertIn('anchor', logs.output[0])
+            with open(output, encoding='utf-8') as f:
+                self.assertNotIn('# kept', f.read())
+
+    def test_mapped_file(self):
+        """
+          a file is parsed from its mapping, finding what its text does, the mapping kept,
+          for the dumper to splice, only if splicing
+        """
+        spec = ("openapi: 3.0.0\n"
+                "info: {title: ü€😀, description: " + "ü€😀" * 30000 + "}\n"
+                "paths:\n"
+                "  /wibble:\n"
+                "    get:\n"
+                "      responses:\n"
+                "        '200': {$ref: '#/components/responses/ok'}\n"
+                "components:\n"
+                "  responses:\n"
+                "    ok: {description: ok}\n"
+                "    ünused: {description: ü€😀}\n")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(file, 'w', encoding='utf-8') as f:
+                f.write(spec)
+            json_file = os.path.join(tmpdir, 'openapi.json')
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(yaml.safe_load(spec), f, indent=2, ensure_ascii=False)
+            for source, options in ((file, ['--loader-backend', 'python']), (file, ['--no-scan']), (file, []),
+                                    (json_file, ['--json-backend', 'stream']), (json_file, ['--json-backend', 'stdlib'])):
+                sanitizer = Sanitizer(ArgParser().parse_args([source, '-l'] + options))
+                sanitizer.sanitize(source)
+                self.assertIsNone(sanitizer.loader.buffer)
+                found = {path: entry.line for path, entry in sanitizer.analyzer.unused_components.items()}
+                with open(source, encoding='utf-8') as f:
+                    fmt = OpenapiFormat.YAML if source == file else OpenapiFormat.JSON
+                    sanitizer.sanitize_text(f.read(), fmt)
+                self.assertDictEqual(found, {path: entry.line for path, entry in sanitizer.analyzer.unused_components.items()},
+                                     options)
+                self.assertListEqual(list(found), ['/components/responses/ünused'], options)
+            sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-l', '-r', '--splice']))
+            sanitizer.sanitize(file)
+            buffer = sanitizer.loader.buffer
+            self.assertIsInstance(buffer, MappedFile)
+            with open(sanitizer.dump(), encoding='utf-8') as f:
+                self.assertEqual(spec.replace("    ünused: {description: ü€😀}\n", ''), f.read())
+            sanitizer.sanitize_text(spec, OpenapiFormat.YAML)
+            self.assertTrue(buffer.closed)
+            self.assertIsNone(sanitizer.loader.buffer)
+
+    def test_cascade(self):
+        spec = ("openapi: 3.0.0\n"
+                "paths:\n"
+                "  /wibble:\n"
+                "    get:\n"
+                "      responses:\n"
+                "        '200': {$ref: '#/components/responses/ok'}\n"
+                "components:\n"
+                "  responses:\n"
+                "    ok: {description: ok}\n"
+                "    unused: {description: unused, content: {application/json: {schema: {$ref: '#/components/schemas/B'}}}}\n"
+                "  schemas:\n"
+                "    B: {type: array, items: {$ref: '#/components/schemas/C'}}\n"
+                "    C: {type: string}\n"
+                "    D: {type: array, items: {$ref: '#/components/schemas/E'}}\n"
+                "    E: {type: array, items: {$ref: '#/components/schemas/D'}}\n")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, 'openapi.yaml')
+            # --cascade tolerates the unused components it is there to remove, with or without -l
+            for options in [['--cascade', '-l'], ['--cascade']]:
+                with open(file, 'w', encoding='utf-8') as f:
+                    f.write(spec)
+                sanitizer = Sanitizer(ArgParser().parse_args([file] + options))
+                sanitizer.sanitize(file)
+                self.assertDictEqual({path: component.generation
+                                      for path, component in sanitizer.analyzer.unused_components.items()},
+                                     {'/components/responses/unused': 1,
+                                      '/components/schemas/B': 2,
+                                      '/components/schemas/C': 3,
+                                      '/components/schemas/D': 4,
+                                      '/components/schemas/E': 4},
+                                     options)
+                output = sanitizer.dump()
+                with open(output, encoding='utf-8') as dumped:
+                    components = yaml.safe_load(dumped)['components']
+                os.remove(output)
+                self.assertListEqual(list(components['responses']), ['ok'], options)
+                self.assertDictEqual(components['schemas'], {}, options)
+
+    def test_metrics(self):
+        file = "./tests/simple_unused.yaml"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'openapi.yaml')
+            sanitizer = Sanitizer(ArgParser().parse_args([file, '-s', '-l', '-o', output, '--profile']))
+            tracemalloc.start()
+            try:
+                sanitizer.sanitize(file)
+                sanitizer.dump()
+            finally:
+                tracemalloc.stop()
+        metrics = sanitizer.metrics.as_dict()
+        self.assertListEqual(list(metrics['phases']), ['load', 'analyze', 'capture', 'sanitize', 'dump'])
+        for name, phase in metrics['phases'].items():
+            self.assertGreaterEqual(phase['wall'], 0, name)
+            self.assertGreater(phase['peak'], 0, name)
+        self.assertEqual(1, metrics['counts']['unused'])
+        self.assertEqual(0, metrics['counts']['undefined'])
+        self.assertEqual(metrics['counts']['nodes'], len(sanitizer.analyzer.components))
+        self.assertIn("  analyze ", sanitizer.metrics.report())
+        # each spec sanitized has its own
+        with self.assertRaises(InvalidFileException):
+            sanitizer.sanitize("./tests/missing.yaml")
+        self.assertListEqual(['load'], list(sanitizer.metrics.phases))
+        self.assertIsNone(sanitizer.metrics.phases['load'].peak)
+
+    def test_multi_file_fragments(self):
+        """
+          $refs to anywhere in another document, not just its components
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(file, 'w', encoding='utf-8') as spec:
+                spec.write("openapi: 3.0.0\n"
+                           "paths:\n"
+                           "  /wibble:\n"
+                           "    get:\n"
+                           "      parameters:\n"
+                           "        - $ref: 'defs.yaml#/Params/0'\n"
+                           "      responses:\n"
+                           "        '200':\n"
+                           "          description: dog\n"
+                           "          content:\n"
+                           "            application/json:\n"
+                           "              schema: {$ref: 'defs.yaml#/Dog'}\n"
+                           "        '201':\n"
+                           "          description: name\n"
+                           "          content:\n"
+                           "            application/json:\n"
+                           "              schema: {$ref: 'defs.yaml#/components/schemas/Owner/properties/name'}\n"
+                           "        '404':\n"
+                           "          description: nope\n"
+                           "          content:\n"
+                           "            application/json:\n"
+                           "              schema: {$ref: 'defs.yaml#/Nope'}\n"
+                           "components:\n"
+                           "  schemas:\n"
+                           "    Unused: {$ref: 'defs.yaml#/Lonely'}\n")
+            with open(os.path.join(tmpdir, 'defs.yaml'), 'w', encoding='utf-8') as defs:
+                defs.write("Dog:\n"
+                           "  type: object\n"
+                           "  properties:\n"
+                           "    cat: {$ref: '#/Cat'}\n"
+                           "Cat: {type: object}\n"
+                           "Lonely:\n"
+                           "  type: object\n"
+                           "  properties:\n"
+                           "    friend: {$ref: '#/components/schemas/Friend'}\n"
+                           "Params:\n"
+                           "  - {name: wibble, in: query}\n"
+                           "components:\n"
+                           "  schemas:\n"
+                           "    Owner:\n"
+                           "      properties:\n"
+                           "        name: {type: string}\n"
+                           "    Friend: {type: object}\n")
+            for options in ([], ['--no-scan']):
+                sanitizer = Sanitizer(ArgParser().parse_args([file] + options))
+                with self.assertRaises(InvalidYamlException):
+                    sanitizer.sanitize(file)
+                analyzer = sanitizer.analyzer
+                self.assertListEqual(['defs.yaml#/Nope'], list(analyzer.undefined_components), options)
+                self.assertSetEqual({'/components/schemas/Unused', 'defs.yaml#/Lonely',
+                                     'defs.yaml#/components/schemas/Friend'},
+                                    set(analyzer.unused_components), options)
+
+    def test_multi_file_missing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, 'openapi.yaml')
+            with open(file, 'w', encoding='utf-8') as spec:
+                spec.write("openapi: 3.0.0\n" +
+                           "paths:\n" +
+                           "  /wibble:\n" +
+                           "    $ref: 'wibble.yaml'\n")
+            args = ArgParser().parse_args([file])
+            sanitizer = Sanitizer(args)
+            with self.assertRaises(InvalidFileException):
+                sanitizer.sanitize(file)
@@ -0,0 +1,97 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.service import Service
+
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        args = ArgParser().parse_args(['--serve', '--port', '0', '--jobs', '1'])
+        self.service = Service(args)
+        self.address = self.service.start()
+        self.thread = threading.Thread(target=self.service.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.service.server.shutdown()
+        self.thread.join()
+
+    def post(self, resource, file, content_type='application/yaml'):
+        with open(file, 'rb') as f:
+            request = urllib.request.Request(f"{self.address}{resource}", data=f.read(),
+                                             headers={'Content-Type': content_type})
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+    def test_analyze(self):
+        for _ in range(2):
+            result = self.post('/analyze', "./tests/less_simple.yaml")
+            self.assertEqual(result['status'], 'error')
+            self.assertEqual({unused['path']: unused['line'] for unused in result['unused']},
+                             {'/components/schemas/schemaA': 55, '/components/parameters/unusedParameter': 20})
+            self.assertListEqual([undefined['path'] for undefined in result['undefined']],
+                                 ['/components/responses/undefinedA'])
+        result = self.post('/analyze', "./tests/less_simple.json", 'application/json')
+        self.assertEqual(len(result['unused']), 2)
+        with urllib.request.urlopen(f"{self.address}/health") as response:
+            health = json.load(response)
+        self.assertEqual(health['requests'], 3)
+        self.assertEqual(health['cache_hits'], 1)
+
+    def test_sanitize(self):
+        result = self.post('/analyze?sanitize=tag', "./tests/simple_unused.yaml")
+        self.assertEqual(result['status'], 'dirty')
+        self.assertIn('unused: true', result['sanitized'])
+
+    def test_bad_requests(self):
+        for resource, code in (('/wibble', 404), ('/analyze?sanitize=wibble', 400), ('/analyze?format=xml', 400)):
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.post(resource, "./tests/simple.yaml")
+            self.assertEqual(context.exception.code, code, resource)
+
+    def test_socket(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'service.sock')
+        args = ArgParser().parse_args(['--serve', '--socket', path, '--jobs', '1'])
+        # only ever replacing a socket
+        with open(path, 'w') as f:
+            f.write('wibble')
+        service = Service(args)
+        with self.assertRaises(FileExistsError):
+            service.start()
+        service.stop()
+        self.assertTrue(os.path.isfile(path))
+        os.unlink(path)
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(path)
+        service = Service(args)
+        self.assertEqual(path, service.start())
+        service.stop()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#######################################################################
+# Tests for openapi-spec-sanitizer
+# Copyright David Turland 2023
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+########################################################################
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from openapi_spec_sanitizer.analyzer import Analyzer
+from openapi_spec_sanitizer.argparser import ArgParser
+from openapi_spec_sanitizer.batch import BatchResult
+from openapi_spec_sanitizer.sanitizer import Sanitizer
+from openapi_spec_sanitizer.watch import Watcher
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.file = os.path.join(self.tmpdir, 'spec.yaml')
+        shutil.copyfile("./tests/less_simple.yaml", self.file)
+        self.parser = ArgParser()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def edit(self, old, new, mtime):
+        with open(self.file) as f:
+            text = f.read()
+        with open(self.file, 'w') as f:
+            f.write(text.replace(old, new))
+        os.utime(self.file, ns=(mtime, mtime))
+
+    def found(self, analyzer):
+        return ({path: entry.line for path, entry in analyzer.unused_components.items()},
+                set(analyzer.undefined_components))
+
+    def expected(self):
+        sanitizer = Sanitizer(self.parser.parse_args([self.file]))
+        try:
+            sanitizer.sanitize(self.file)
+        except Exception:
+            pass
+        return self.found(sanitizer.analyzer)
+
+    def test_watch(self):
+        watcher = Watcher(self.parser.parse_args([self.file, '--watch']), self.file)
+        self.assertEqual(watcher.check().status, BatchResult.ERROR)
+        self.assertIsNone(watcher.check())
+        with mock.patch.object(Analyzer, 'reanalyze', side_effect=Analyzer.reanalyze, autospec=True) as reanalyze:
+            # fixing the undefined $ref, moving everything down a line
+            self.edit("      responses:\n", "\n      responses:\n", 1)
+            self.edit("          $ref: '#/components/responses/undefinedA'\n", "          description: fixed\n", 2)
+            self.assertEqual(watcher.check().status, BatchResult.DIRTY)
+            self.assertEqual(self.found(watcher.sanitizer.analyzer), self.expected())
+            # no longer using schemaAB, so nor schemaAC
+            self.edit("            $ref: '#/components/schemas/schemaAB'\n", "            type: string\n", 3)
+            watcher.check()
+            self.assertEqual(self.found(watcher.sanitizer.analyzer), self.expected())
+            self.assertIn('/components/schemas/schemaAC', watcher.sanitizer.analyzer.unused_components)
+            # a syntax error, and then not
+            self.edit("paths:", "paths: [", 4)
+            self.assertEqual(watcher.check().status, BatchResult.ERROR)
+            self.edit("paths: [", "paths:", 5)
+            watcher.check()
+            self.assertEqual(self.found(watcher.sanitizer.analyzer), self.expected())
+            self.assertEqual(reanalyze.call_count, 3)
+
+    def test_syntax_error_report(self):
+        # a report a line, even of a spec that doesn't parse, mid edit
+        self.edit("paths:", "paths: [", 1)
+        for report_format in ('json', 'sarif'):
+            watcher = Watcher(self.parser.parse_args([self.file, '--watch', '--report-format', report_format]), self.file)
+            with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                result = watcher.check()
+            self.assertEqual(result.status, BatchResult.ERROR)
+            report = json.loads(stdout.getvalue())
+            if 'json' == report_format:
+                self.assertEqual('error', report['files'][0]['status'])
+                self.assertIn('flow sequence', report['files'][0]['message'])
+            else:
+                notifications = report['runs'][0]['invocations'][0]['toolExecutionNotifications']
+                self.assertIn(self.file, notifications[0]['message']['text'])
+
+
+if __name__ == '__main__':
+    unittest.main()